@@ -209,7 +209,9 @@ export default function AnalyzePage() {
 
             const data = await response.json()
 
-            const processedImageUrl = `data:image/jpeg;base64,${data.processedImage}`
+            const processedImageUrl = data.processedImageUrl
+                ? data.processedImageUrl
+                : `data:${data.processedImageType || "image/jpeg"};base64,${data.processedImage}`
 
             const result: AnalysisResult = {
                 processedImage: processedImageUrl,
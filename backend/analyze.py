@@ -1,57 +1,285 @@
-from call_llm import call_llm
-from calculate_angle import calculate_angle
-from skill_rules import SKILL_RULES
-from calculate_skill_score import calculate_skill_score
+import asyncio
+import concurrent.futures
+import logging
+import threading
 
-def analyze(selected_skill, landmarks):
-    
-    if selected_skill not in SKILL_RULES:
+import config
+from call_llm import generate_coaching, format_coaching, coaching_prefix, stream_coaching
+from coaching_cache import coaching_cache, form_signature
+from fallback_coach import template_coaching
+from metrics import timed, COACHING_SOURCE
+from rule_registry import rule_registry
+from calculate_skill_score import evaluate_skill, build_score_data
+from skill_ranking import rank_skills, suggest_progression
+from workers import get_llm_executor
+
+logger = logging.getLogger(__name__)
+
+def prepare_analysis(selected_skill, landmarks, rank=False):
+    """
+    Score the pose and build the short analysis text that is handed to the LLM.
+
+    Every angle is computed exactly once; the score payload, the text summary and
+    the structured per-angle results are all rendered from that single pass.
+    This is the CPU-bound half of `analyze`; `finish_analysis` does the LLM call.
+
+    With `rank`, or when no skill is given, the pose is also scored against the
+    whole catalogue; a missing skill is then replaced by the best match, as long
+    as it reaches SKILL_DETECT_MIN_MATCH_SCORE.
+
+    Returns:
+        dict: "summary" (str, or None when the skill is not supported),
+              "feedback" (str, only set when no LLM call is needed), "score_data",
+              "angles" (structured per-angle results), "skill", "skill_detected",
+              and "ranking"/"progression" (None unless the catalogue was ranked)
+    """
+    # Take one snapshot so a concurrent rules reload cannot mix two versions in one analysis
+    rules = rule_registry.snapshot
+
+    ranking = None
+    skill_detected = False
+    if rank or not selected_skill:
+        with timed("ranking"):
+            ranking = rank_skills(landmarks, rules)
+        if not selected_skill and ranking and ranking[0]["match_score"] >= config.SKILL_DETECT_MIN_MATCH_SCORE:
+            selected_skill = ranking[0]["skill"]
+            skill_detected = True
+
+    if selected_skill not in rules.raw:
+        feedback = (
+            f"Analysis for the skill '{selected_skill}' is not implemented yet." if selected_skill
+            else "Could not recognize a skill in this pose. Choose one with skill_id."
+        )
         return {
-            "feedback": f"Analysis for the skill '{selected_skill}' is not implemented yet.",
-            "score_data": {"overall_score": 0.0, "is_passing": False}
+            "summary": None,
+            "feedback": feedback,
+            "score_data": {"overall_score": 0.0, "is_passing": False},
+            "angles": [],
+            "skill": selected_skill,
+            "skill_detected": False,
+            "ranking": ranking,
+            "progression": None,
+            "rules_version": rules.version
         }
 
-    # Calculate skill score
-    score_data = calculate_skill_score(selected_skill, landmarks, SKILL_RULES)
-    
-    rules = SKILL_RULES[selected_skill]
-    feedback_list = []
-
-    for angle_rule in rules["angles_to_check"]:
-        angle_name = angle_rule["name"]
-        p1_name, p2_name, p3_name = angle_rule["points"]
-        min_angle, max_angle = angle_rule["min"], angle_rule["max"]
-
-        # Get coordinates for the three points
-        p1 = landmarks.get(p1_name)
-        p2 = landmarks.get(p2_name)
-        p3 = landmarks.get(p3_name)
-
-        # Robustness Check: Ensure all landmarks were detected
-        if not all([p1, p2, p3]):
-            missing_points = [name for name, point in zip([p1_name, p2_name, p3_name], [p1, p2, p3]) if not point]
-            feedback = f"Could not check {angle_name} because the following points were not detected: {', '.join(missing_points)}."
-            feedback_list.append(feedback)
-            continue # Skip to the next angle
-
-        # Calculate the angle and generate feedback
-        calculated_angle = calculate_angle(p1, p2, p3)
-        
-        if min_angle <= calculated_angle <= max_angle:
-            feedback = f"{angle_name}: Your angle is {calculated_angle:.1f}°, which is in the ideal range of {min_angle}-{max_angle}°."
-        else:
-            feedback = f"{angle_name}: Your angle is {calculated_angle:.1f}°. Try to aim for the ideal range of {min_angle}-{max_angle}°."
-        
-        feedback_list.append(feedback)
-        
+    with timed("scoring"):
+        angle_results, overall_score = evaluate_skill(selected_skill, landmarks, rules.raw)
+        score_data = build_score_data(angle_results, overall_score)
+        feedback_list = [angle_result.feedback_line() for angle_result in angle_results]
+
     # Add score information to feedback
     score_feedback = f"\n\nSCORE: {score_data['overall_score']}/100 ({'PASSING' if score_data['is_passing'] else 'NEEDS IMPROVEMENT'})"
     
     all_feedback = "SKILL NAME: " + selected_skill + "\n\n" + "SHORT ANALYSIS RESULTS:\n\n" + "\n\n".join(feedback_list) + score_feedback
-    
-    llm_response = call_llm(all_feedback)
 
     return {
-        "feedback": llm_response,
-        "score_data": score_data
+        "summary": all_feedback,
+        "feedback": None,
+        "score_data": score_data,
+        "angles": [angle_result.to_dict() for angle_result in angle_results],
+        "skill": selected_skill,
+        "skill_detected": skill_detected,
+        "ranking": ranking,
+        "progression": suggest_progression(ranking, selected_skill) if ranking else None,
+        "rules_version": rules.version
     }
+
+# Cache key -> concurrent Future of the coaching text. Identical forms analyzed at the
+# same time share one LLM call instead of each paying for their own.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+class EmptyCoachingError(Exception):
+    """The LLM answered without any coaching text (e.g. a blocked or empty response)."""
+
+    def __init__(self):
+        super().__init__("The LLM returned no coaching text.")
+
+def _generate_and_cache(cache_key, summary, selected_skill):
+    try:
+        coaching = generate_coaching(summary, selected_skill)
+        # An empty answer is an error, not a result: it must not stick in the cache until the TTL
+        if not coaching or not coaching.strip():
+            raise EmptyCoachingError()
+        coaching_cache.set(cache_key, coaching)
+        return coaching
+    finally:
+        # Cache first, then unregister, so a new identical request finds one or the other
+        with _in_flight_lock:
+            _in_flight.pop(cache_key, None)
+
+def start_coaching(prepared):
+    """
+    Find the coaching text for a prepared analysis, or start the LLM call that produces it.
+
+    The call runs on the LLM pool and keeps going if the waiting request gives up,
+    so a slow answer still lands in the cache for the next identical form.
+
+    Returns:
+        tuple: (cached text or None, concurrent.futures.Future of the text or None)
+    """
+    cache_key = form_signature(prepared["skill"], prepared["angles"], prepared["rules_version"])
+    coaching = coaching_cache.get(cache_key)
+    if coaching is not None:
+        return coaching, None
+
+    with _in_flight_lock:
+        future = _in_flight.get(cache_key)
+        if future is None:
+            future = get_llm_executor().submit(_generate_and_cache, cache_key, prepared["summary"], prepared["skill"])
+            _in_flight[cache_key] = future
+    return None, future
+
+def fallback_coaching(prepared, reason):
+    """Deterministic template coaching, used when the LLM misses the latency budget or fails."""
+    logger.warning("Using template coaching", extra={"skill": prepared["skill"], "reason": reason})
+    return template_coaching(prepared["skill"], prepared["angles"], prepared["score_data"])
+
+def _finished(prepared, coaching, source):
+    COACHING_SOURCE.inc(source=source)
+    if prepared["summary"] is None:
+        feedback = prepared["feedback"]
+    else:
+        # Only the coaching text varies by source; the short summary always reflects this attempt's numbers
+        feedback = format_coaching(prepared["summary"], coaching)
+
+    return {
+        "feedback": feedback,
+        "score_data": prepared["score_data"],
+        "coaching_source": source
+    }
+
+def finish_analysis(prepared, budget_seconds=None):
+    """
+    Turn a `prepare_analysis` result into the final response, waiting at most `budget_seconds` for the LLM.
+
+    Blocking variant for scripts and benchmarks; the API uses `finish_analysis_async`.
+
+    Returns:
+        dict: "feedback", "score_data" and "coaching_source" ("llm", "cache",
+              "fallback", or "none" when the skill is not supported)
+    """
+    if prepared["summary"] is None:
+        return _finished(prepared, None, "none")
+
+    budget_seconds = budget_seconds or config.COACHING_BUDGET_SECONDS
+    coaching, future = start_coaching(prepared)
+    if coaching is not None:
+        return _finished(prepared, coaching, "cache")
+
+    try:
+        return _finished(prepared, future.result(timeout=budget_seconds), "llm")
+    except concurrent.futures.TimeoutError:
+        return _finished(prepared, fallback_coaching(prepared, "timeout"), "fallback")
+    except Exception as e:
+        return _finished(prepared, fallback_coaching(prepared, str(e)), "fallback")
+
+async def finish_analysis_async(prepared, budget_seconds=None):
+    """Async variant of `finish_analysis`; waiting for the LLM does not hold a pool thread."""
+    if prepared["summary"] is None:
+        return _finished(prepared, None, "none")
+
+    budget_seconds = budget_seconds or config.COACHING_BUDGET_SECONDS
+    coaching, future = start_coaching(prepared)
+    if coaching is not None:
+        return _finished(prepared, coaching, "cache")
+
+    try:
+        # shield: giving up on the wait must not cancel the shared call
+        coaching = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), budget_seconds)
+        return _finished(prepared, coaching, "llm")
+    except asyncio.TimeoutError:
+        return _finished(prepared, fallback_coaching(prepared, "timeout"), "fallback")
+    except Exception as e:
+        return _finished(prepared, fallback_coaching(prepared, str(e)), "fallback")
+
+async def stream_analysis(prepared, budget_seconds=None):
+    """
+    Async counterpart of `finish_analysis` that yields the feedback text in chunks.
+
+    Joining every chunk gives the same `feedback` that `finish_analysis` returns.
+    Cache hits and shared in-flight calls are yielded in one piece; otherwise
+    Gemini's tokens stream as they arrive. The budget applies to the first token:
+    if it is missed, or the call fails before producing anything, the template
+    coaching is yielded instead. The path taken is stored in
+    prepared["coaching_source"].
+    """
+    if prepared["summary"] is None:
+        prepared["coaching_source"] = "none"
+        COACHING_SOURCE.inc(source="none")
+        yield prepared["feedback"]
+        return
+
+    budget_seconds = budget_seconds or config.COACHING_BUDGET_SECONDS
+    yield coaching_prefix(prepared["summary"])
+
+    cache_key = form_signature(prepared["skill"], prepared["angles"], prepared["rules_version"])
+    coaching = coaching_cache.get(cache_key)
+    source = "cache"
+
+    if coaching is None:
+        with _in_flight_lock:
+            shared = _in_flight.get(cache_key)
+            if shared is None:
+                # Lead the call: identical requests arriving meanwhile wait on this future
+                own = concurrent.futures.Future()
+                _in_flight[cache_key] = own
+
+        if shared is not None:
+            try:
+                coaching = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(shared)), budget_seconds)
+                source = "llm"
+            except asyncio.TimeoutError:
+                coaching, source = fallback_coaching(prepared, "timeout"), "fallback"
+            except Exception as e:
+                coaching, source = fallback_coaching(prepared, str(e)), "fallback"
+        else:
+            try:
+                async for chunk in _stream_and_cache(prepared, cache_key, own, budget_seconds):
+                    yield chunk
+                return
+            finally:
+                with _in_flight_lock:
+                    if _in_flight.get(cache_key) is own:
+                        del _in_flight[cache_key]
+
+    prepared["coaching_source"] = source
+    COACHING_SOURCE.inc(source=source)
+    yield coaching
+
+async def _stream_and_cache(prepared, cache_key, own, budget_seconds):
+    """Stream a fresh LLM call, resolving `own` for any requests that joined it."""
+    stream = stream_coaching(prepared["summary"], prepared["skill"])
+    try:
+        first_chunk = await asyncio.wait_for(anext(stream), budget_seconds)
+    except Exception as e:
+        await stream.aclose()
+        if isinstance(e, StopAsyncIteration):
+            # Finished without any text: fall back, and leave nothing in the cache
+            e = EmptyCoachingError()
+        own.set_exception(e)
+        prepared["coaching_source"] = "fallback"
+        COACHING_SOURCE.inc(source="fallback")
+        yield fallback_coaching(prepared, "timeout" if isinstance(e, asyncio.TimeoutError) else str(e))
+        return
+
+    prepared["coaching_source"] = "llm"
+    COACHING_SOURCE.inc(source="llm")
+    chunks = [first_chunk]
+    try:
+        yield first_chunk
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+    except BaseException as e:
+        # Failed mid-stream or the client went away: joined requests fall back
+        own.set_exception(e if isinstance(e, Exception) else RuntimeError("Coaching stream was interrupted."))
+        raise
+
+    coaching = "".join(chunks)
+    if coaching.strip():
+        coaching_cache.set(cache_key, coaching)
+    own.set_result(coaching)
+
+def analyze(selected_skill, landmarks):
+    return finish_analysis(prepare_analysis(selected_skill, landmarks))
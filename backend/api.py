@@ -1,14 +1,75 @@
 # Dummy FastAPI app
-from fastapi import FastAPI, UploadFile, File, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import base64
+import json
+import logging
 import os
+import tempfile
+import time
 import uuid
-from pose_detector import perform_pose_detection
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+import config
+from logging_setup import configure_logging
+from metrics import LIVE_FRAMES, REQUEST_SECONDS, register_gauges, render_metrics
+from pose_detector import estimate_decode_bytes, perform_pose_detection
+from pose_pool import get_pose_pool, close_pose_pool
+from workers import admission, estimate_request_memory, estimate_video_memory, OverloadedError, run_batch, run_cpu, run_llm, shutdown_executors, warm_cpu_executor, worker_stats
+from upload_limits import UploadLimitMiddleware, UploadTooLargeError
 import analyze
+from coaching_cache import coaching_cache
+from pose_cache import pose_cache
+from image_preprocess import output_options_from_form
+from image_store import image_store
+from history_store import history_store
+import video_analyzer
+from landmarks import ALL_LANDMARK_NAMES
+from live_session import LiveSession
+from call_llm import call_llm, generate_coaching
+from coaching_prompts import system_prompt
+from startup import startup_report
 
-app = FastAPI()
+configure_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build and warm the pose detectors before the first request arrives. This runs
+    # in every worker after any pre-fork (see serve.py): MediaPipe graphs cannot be forked.
+    # Process workers warm their own pools, so the parent only needs one in thread mode.
+    with startup_report.warming("pose_pool"):
+        if config.CPU_EXECUTOR != "process":
+            get_pose_pool()
+        else:
+            warm_cpu_executor()
+    # Build every skill's coaching prompt once instead of on the first coaching call
+    with startup_report.warming("coaching_prompts"):
+        system_prompt(None)
+    with startup_report.warming("history_store"):
+        history_store.open()
+    startup_report.mark_ready()
+    yield
+    # Fail readiness checks first so load balancers stop routing here while we drain
+    startup_report.mark_stopping()
+    shutdown_executors()
+    history_store.close()
+    close_pose_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+# Added before CORS so CORS stays the outer layer and 413 responses still carry its headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    default_limit=config.MAX_UPLOAD_BYTES,
+    path_limits={
+        "/analyze/batch": config.MAX_BATCH_UPLOAD_BYTES,
+        "/analyze/video": config.MAX_VIDEO_UPLOAD_BYTES,
+    },
+)
 
 origins = [
     "http://localhost:3000",
@@ -23,39 +84,709 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template (e.g. /images/{image_id}) so ids do not explode the series count
+    elapsed = time.perf_counter() - start
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    startup_report.observe_request(route, elapsed)
+    return response
+
+def collect_service_gauges():
+    admission_stats = admission.stats()
+    coaching_stats = coaching_cache.stats()
+    pose_stats = pose_cache.stats()
+    history_stats = history_store.stats()
+    return {
+        "now_admission_in_flight": ("gauge", "Requests currently running the pipeline.", admission_stats["in_flight"]),
+        "now_admission_queue_depth": ("gauge", "Requests waiting for an admission slot.", admission_stats["queue_depth"]),
+        "now_admission_rejected_total": ("counter", "Requests rejected with 503.", admission_stats["rejected_total"]),
+        "now_admission_memory_bytes": ("gauge", "Estimated memory reserved by admitted requests.", admission_stats["memory_in_use_bytes"]),
+        "now_coaching_cache_hits_total": ("counter", "Coaching cache hits.", coaching_stats["hits"]),
+        "now_coaching_cache_misses_total": ("counter", "Coaching cache misses.", coaching_stats["misses"]),
+        "now_coaching_cache_entries": ("gauge", "Entries in the coaching cache.", coaching_stats["entries"]),
+        "now_pose_cache_hits_total": ("counter", "Pose cache hits (memory and disk).", pose_stats["hits"] + pose_stats["disk_hits"]),
+        "now_pose_cache_misses_total": ("counter", "Pose cache misses.", pose_stats["misses"]),
+        "now_pose_cache_bytes": ("gauge", "Bytes held by the in-memory pose cache.", pose_stats["bytes"]),
+        "now_live_sessions": ("gauge", "Open /live WebSocket sessions.", live_sessions_active),
+        "now_history_pending": ("gauge", "Attempts queued for the history store.", history_stats["pending"]),
+        "now_history_written_total": ("counter", "Attempts written to the history store.", history_stats["written_total"]),
+        "now_history_dropped_total": ("counter", "Attempts dropped because the history queue was full.", history_stats["dropped_total"]),
+    }
+
+register_gauges(collect_service_gauges)
+
+def overloaded_response(error: OverloadedError):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)},
+        content={"message": str(error)},
+    )
+
+async def detect_pose(contents, output_options, run=run_cpu):
+    """
+    Pose detection with the content-addressed cache in front of it.
+
+    A repeat upload (even under a different skill) skips the CV stage entirely;
+    only scoring is rerun by the caller. `run` picks the executor for cache misses.
+    """
+    # Hashing a multi-megabyte upload and reading the disk tier are kept off the event loop
+    key, cached = await asyncio.to_thread(pose_cache.lookup, contents, output_options.cache_tag())
+    if cached is not None:
+        return cached
+
+    processed_image_bytes, landmarks = await run(perform_pose_detection, contents, output_options)
+    await asyncio.to_thread(pose_cache.set, key, processed_image_bytes, landmarks)
+    return processed_image_bytes, landmarks
+
+def declared_upload_bytes(request):
+    """The request's Content-Length, or 0 when it was not sent (UploadLimitMiddleware still caps the body)."""
+    content_length = request.headers.get("content-length", "")
+    return int(content_length) if content_length.isdigit() else 0
+
+# Enough of an upload to find the JPEG start-of-frame past a large EXIF/ICC block
+IMAGE_HEADER_PROBE_BYTES = 256 * 1024
+
+async def image_decode_estimate(uploaded_file):
+    """Decode memory of one uploaded photo, sized from its header; the rest of the spool is not read."""
+    header = await uploaded_file.read(IMAGE_HEADER_PROBE_BYTES)
+    await uploaded_file.seek(0)
+    return estimate_decode_bytes(header)
+
+async def photo_memory_estimate(request, uploaded_file):
+    """
+    Admission memory for a single-photo request.
+
+    Read after the form is parsed (Starlette spools large parts to disk), so the
+    reservation reflects the image's real dimensions: full-resolution PNG and
+    person-ROI decodes are counted, not just the reduced decode.
+    """
+    return estimate_request_memory(declared_upload_bytes(request), await image_decode_estimate(uploaded_file))
+
+def wants_inline_image(form_data):
+    return str(form_data.get("inline_image") or "").lower() in ("1", "true", "yes")
+
+def wants_ranking(form_data):
+    return str(form_data.get("rank_skills") or "").lower() in ("1", "true", "yes")
+
+def ranking_fields(prepared):
+    """Response fields for the whole-catalogue ranking; empty unless it ran (rank_skills=true or no skill_id)."""
+    if prepared["ranking"] is None:
+        return {}
+    return {
+        "skill": prepared["skill"],
+        "skillDetected": prepared["skill_detected"],
+        "skillRanking": prepared["ranking"],
+        "progression": prepared["progression"],
+    }
+
+async def image_fields(request, processed_image_bytes, output_options, inline):
+    """
+    Response fields for the annotated image.
+
+    By default the image is written to the blob store and only its URL is returned;
+    `inline` keeps the old base64 `processedImage` field for older clients.
+    """
+    if not processed_image_bytes:
+        return {"processedImage": None, "processedImageUrl": None, "processedImageType": None}
+
+    image_id = await asyncio.to_thread(image_store.put, processed_image_bytes, output_options.media_type)
+    return {
+        "processedImage": base64.b64encode(processed_image_bytes).decode("utf-8") if inline else None,
+        "processedImageUrl": str(request.url_for("read_image", image_id=image_id)),
+        "processedImageType": output_options.media_type,
+    }
+
+def parse_range(range_header, size):
+    """Parse a single "bytes=start-end" range. Returns (start, end) inclusive, or None if unsatisfiable."""
+    if not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header (a list of entity tags, or "*") matches the ETag, using weak comparison."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def read_file_range(path, start, length):
+    """Read `length` bytes from `start` without loading the rest of the file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@app.get("/images/{image_id}", name="read_image")
+async def read_image(image_id: str, request: Request):
+    path = image_store.path_for(image_id)
+    if path is None:
+        return JSONResponse(status_code=404, content={"message": "Image not found."})
+
+    # Content-addressed ids never change meaning, so the id is a strong ETag and the image is immutable
+    headers = {
+        "ETag": f'"{image_id}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    media_type = image_store.media_type_for(image_id)
+    range_header = request.headers.get("range")
+    try:
+        if not range_header:
+            image_bytes = await asyncio.to_thread(Path(path).read_bytes)
+            return Response(content=image_bytes, media_type=media_type, headers=headers)
+
+        size = os.path.getsize(path)
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        # Only the requested slice is read, so resuming a large image does not load all of it
+        image_bytes = await asyncio.to_thread(read_file_range, path, start, end - start + 1)
+    except OSError:
+        return JSONResponse(status_code=404, content={"message": "Image not found."})
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=image_bytes, status_code=206, media_type=media_type, headers=headers)
+
 @app.get("/")
 def read_root():
     return {"Landing": "Page"}
 
+@app.get("/ready")
+def read_readiness():
+    """
+    Readiness probe: 200 once this worker has warmed its pose detectors, 503 before that and while shutting down.
+
+    The body is the worker's startup report: import and warmup timings and the latency of its first request.
+    """
+    return JSONResponse(status_code=200 if startup_report.ready else 503, content=startup_report.as_dict())
+
+@app.get("/metrics")
+def read_metrics():
+    # Stage timings are recorded per process; with CPU_EXECUTOR=process the CV stages
+    # run in worker processes and only the API-side stages show up here.
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/workers")
+def read_worker_stats():
+    return worker_stats()
+
+@app.get("/stats/cache")
+def read_cache_stats():
+    return {"coaching": coaching_cache.stats(), "pose": pose_cache.stats()}
+
+def history_disabled_response():
+    return JSONResponse(status_code=404, content={"message": "Attempt history is disabled (HISTORY_DB is empty)."})
+
+@app.get("/history/{user_id}/{skill_id}")
+async def read_history(user_id: str, skill_id: str, limit: int = 20):
+    """The user's most recent attempts at a skill, newest first."""
+    if not history_store.enabled:
+        return history_disabled_response()
+    attempts = await asyncio.to_thread(history_store.recent, user_id, skill_id, max(1, min(limit, 500)))
+    return {"user_id": user_id, "skill": skill_id, "attempts": attempts}
+
+@app.get("/history/{user_id}/{skill_id}/trend")
+async def read_history_trend(user_id: str, skill_id: str, period: str = "day", limit: int = 90):
+    """Per-day or per-week score trend for charting, oldest first, served from the precomputed rollups."""
+    if not history_store.enabled:
+        return history_disabled_response()
+    try:
+        points = await asyncio.to_thread(history_store.trend, user_id, skill_id, period, max(1, min(limit, 1000)))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    return {"user_id": user_id, "skill": skill_id, "period": period, "points": points}
+
+@app.get("/history/{user_id}/{skill_id}/best")
+async def read_history_best(user_id: str, skill_id: str):
+    """All-time best score and best hold for a skill."""
+    if not history_store.enabled:
+        return history_disabled_response()
+    best = await asyncio.to_thread(history_store.best, user_id, skill_id)
+    return {"user_id": user_id, "skill": skill_id, **best}
+
 @app.post("/analyze")
 async def analyze_photo(request: Request):
-    print("--- HEADERS RECEIVED ---")
-    print(request.headers)
-    print("------------------------")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Analyze request received", extra={"headers": dict(request.headers)})
 
     try:
         form_data = await request.form()
         uploaded_file = form_data.get("file")
         selected_skill = form_data.get("skill_id")
+        # "structured" skips the LLM and returns per-angle results for clients that render their own text
+        response_mode = form_data.get("mode") or "coaching"
 
         if not uploaded_file or not hasattr(uploaded_file, 'read'):
-            print("ERROR: 'file' not found in form data or is not a file.")
+            logger.warning("'file' not found in form data or is not a file.")
             return JSONResponse(status_code=400, content={"message": "File not found in request."})
 
-        contents = await uploaded_file.read()
-        processed_image_bytes, landmarks, image_bytes = perform_pose_detection(contents)
-        processed_image_base64 = base64.b64encode(processed_image_bytes).decode("utf-8")
-        
-        analysis_result = analyze.analyze(selected_skill, landmarks)
+        try:
+            output_options = output_options_from_form(form_data)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
+
+        async with admission.admit(await photo_memory_estimate(request, uploaded_file)):
+            contents = await uploaded_file.read()
+            # Drop the multipart spool now rather than when the request ends
+            await uploaded_file.close()
+
+            # CV and scoring run on the CPU pool, the Gemini call on the LLM pool,
+            # so the event loop stays free to serve other connections.
+            processed_image_bytes, landmarks = await detect_pose(contents, output_options)
+            images = await image_fields(request, processed_image_bytes, output_options, wants_inline_image(form_data))
+
+            prepared = await run_cpu(analyze.prepare_analysis, selected_skill, landmarks, wants_ranking(form_data))
+            if form_data.get("user_id"):
+                history_store.record_analysis(form_data["user_id"], prepared)
+
+            if response_mode == "structured":
+                return JSONResponse(content={
+                    **images,
+                    "score": prepared["score_data"]["overall_score"],
+                    "scoreData": prepared["score_data"],
+                    "angles": prepared["angles"],
+                    "message": prepared["feedback"],
+                    **ranking_fields(prepared),
+                })
+
+        # The LLM stage only awaits network I/O, so it runs outside the admission slot.
+        # Bounded by COACHING_BUDGET_SECONDS; a slow or failing LLM yields template coaching instead
+        analysis_result = await analyze.finish_analysis_async(prepared)
 
         return JSONResponse(content={
-            "processedImage": processed_image_base64,
+            **images,
             "analysis": analysis_result["feedback"],
+            "coachingSource": analysis_result["coaching_source"],
             "score": analysis_result["score_data"]["overall_score"],
             "scoreData": analysis_result["score_data"],
-            "skillLevel": "Beginner+"
+            "skillLevel": "Beginner+",
+            **ranking_fields(prepared),
         })
 
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    except UploadTooLargeError:
+        # UploadLimitMiddleware answers with 413
+        raise
+
     except Exception as e:
-        print(f"An error occurred during processing: {e}")
+        logger.exception("An error occurred during processing")
         return JSONResponse(status_code=500, content={"message": f"An unexpected error occurred: {e}"})
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that awaits `on_close` once it is done, however it ends.
+
+    A generator's own `finally` does not run if the body never starts (the
+    client disconnected first), so resources held for the stream, such as an
+    admission slot, are released here instead.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze/stream")
+async def analyze_photo_stream(request: Request):
+    """
+    Server-Sent Events version of /analyze.
+
+    Emits a "result" event with the annotated image and score data as soon as the
+    CV stage is done, then "token" events with the coaching text as Gemini
+    produces it, and finally "done" with the complete analysis text.
+    """
+    try:
+        form_data = await request.form()
+        uploaded_file = form_data.get("file")
+        selected_skill = form_data.get("skill_id")
+
+        if not uploaded_file or not hasattr(uploaded_file, 'read'):
+            return JSONResponse(status_code=400, content={"message": "File not found in request."})
+
+        try:
+            output_options = output_options_from_form(form_data)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"message": str(e)})
+
+        async with admission.admit(await photo_memory_estimate(request, uploaded_file)):
+            contents = await uploaded_file.read()
+            # Drop the multipart spool now rather than when the request ends
+            await uploaded_file.close()
+            processed_image_bytes, landmarks = await detect_pose(contents, output_options)
+            images = await image_fields(request, processed_image_bytes, output_options, wants_inline_image(form_data))
+            prepared = await run_cpu(analyze.prepare_analysis, selected_skill, landmarks, wants_ranking(form_data))
+            if form_data.get("user_id"):
+                history_store.record_analysis(form_data["user_id"], prepared)
+
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    except UploadTooLargeError:
+        # UploadLimitMiddleware answers with 413
+        raise
+
+    except Exception as e:
+        logger.exception("An error occurred during processing")
+        return JSONResponse(status_code=500, content={"message": f"An unexpected error occurred: {e}"})
+
+    async def events():
+        yield sse_event("result", {
+            **images,
+            "score": prepared["score_data"]["overall_score"],
+            "scoreData": prepared["score_data"],
+            "angles": prepared["angles"],
+            "skillLevel": "Beginner+",
+            **ranking_fields(prepared),
+        })
+
+        # The LLM stage only awaits network I/O, so it runs outside the admission slot
+        chunks = []
+        try:
+            async for chunk in analyze.stream_analysis(prepared):
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            logger.exception("An error occurred while streaming coaching")
+            yield sse_event("error", {"message": f"Coaching failed: {e}"})
+            return
+
+        yield sse_event("done", {"analysis": "".join(chunks), "coachingSource": prepared["coaching_source"]})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+BATCH_COACHING_MODES = ("none", "each", "summary")
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: Request):
+    """
+    Analyze a whole session of photos in one request.
+
+    Multipart fields: repeated `files`, plus either repeated `skill_ids` (one per
+    file, in order) or a single `skill_id` for all of them. `coaching` is "none"
+    (default), "each" (one coaching text per image) or "summary" (one combined
+    text at the end).
+
+    Pose detection fans out over a process pool with one worker per core, and
+    results stream back as NDJSON lines in completion order. Each line carries
+    the `index` of its file; a final {"type": "summary"} line follows in summary mode.
+    """
+    try:
+        form_data = await request.form()
+        uploaded_files = [f for f in form_data.getlist("files") if hasattr(f, "read")]
+        skill_ids = form_data.getlist("skill_ids") or [form_data.get("skill_id")] * len(uploaded_files)
+        coaching_mode = form_data.get("coaching") or "none"
+        user_id = form_data.get("user_id")
+        rank = wants_ranking(form_data)
+
+        if not uploaded_files:
+            raise ValueError("No files found in request.")
+        if len(uploaded_files) > config.BATCH_MAX_IMAGES:
+            raise ValueError(f"A batch can contain at most {config.BATCH_MAX_IMAGES} images.")
+        if len(skill_ids) != len(uploaded_files):
+            raise ValueError("Send one skill_ids entry per file, or a single skill_id for all files.")
+        if coaching_mode not in BATCH_COACHING_MODES:
+            raise ValueError(f"coaching must be one of: {', '.join(BATCH_COACHING_MODES)}.")
+
+        output_options = output_options_from_form(form_data)
+        inline = wants_inline_image(form_data)
+        decode_estimates = [estimate_request_memory(0, await image_decode_estimate(f)) for f in uploaded_files]
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+    # The uploads are held in memory for the whole batch, plus the decodes of the
+    # largest images that can run at once, one per batch worker
+    memory = declared_upload_bytes(request) + sum(sorted(decode_estimates, reverse=True)[:config.BATCH_WORKERS])
+    try:
+        await admission.acquire(memory)
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    try:
+        contents = []
+        for uploaded_file in uploaded_files:
+            contents.append(await uploaded_file.read())
+            await uploaded_file.close()
+        filenames = [uploaded_file.filename for uploaded_file in uploaded_files]
+    except Exception:
+        admission.release(memory)
+        raise
+
+    async def process_item(index):
+        line = {"type": "result", "index": index, "filename": filenames[index], "skill": skill_ids[index]}
+        try:
+            # Detection, scoring and ranking all run on the batch pool; the loop only routes results
+            processed_image_bytes, landmarks = await detect_pose(contents[index], output_options, run=run_batch)
+            prepared = await run_batch(analyze.prepare_analysis, skill_ids[index], landmarks, rank)
+            if user_id:
+                await asyncio.to_thread(history_store.record_analysis, user_id, prepared)
+            line.update(await image_fields(request, processed_image_bytes, output_options, inline))
+            line.update({
+                "status": "ok",
+                "score": prepared["score_data"]["overall_score"],
+                "scoreData": prepared["score_data"],
+                "angles": prepared["angles"],
+                **ranking_fields(prepared),
+            })
+            if prepared["feedback"]:
+                line["message"] = prepared["feedback"]
+            if coaching_mode == "each":
+                analysis_result = await analyze.finish_analysis_async(prepared)
+                line["analysis"] = analysis_result["feedback"]
+                line["coachingSource"] = analysis_result["coaching_source"]
+            return line, prepared
+        except Exception as e:
+            line.update({"status": "error", "message": str(e)})
+            return line, None
+
+    tasks = []
+
+    async def close():
+        # Runs however the response ends, including a client that left before the first line
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Release before awaiting, so a cancelled close cannot leak the slot
+        admission.release(memory)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def results():
+        summaries = []
+        tasks.extend(asyncio.create_task(process_item(index)) for index in range(len(contents)))
+        for next_done in asyncio.as_completed(tasks):
+            line, prepared = await next_done
+            if prepared is not None and prepared["summary"] is not None:
+                summaries.append((line["index"], prepared["summary"], prepared["skill"]))
+            yield json.dumps(line) + "\n"
+
+        if coaching_mode == "summary":
+            summary_line = {"type": "summary", "analysis": None}
+            if summaries:
+                combined = f"TRAINING SESSION WITH {len(summaries)} ANALYZED ATTEMPTS\n\n" + "\n\n---\n\n".join(
+                    f"ATTEMPT {index + 1}\n{summary}" for index, summary, _ in sorted(summaries)
+                )
+                # One skill across the session gets that skill's prompt, mixed sessions the generic one
+                session_skills = {skill for _, _, skill in summaries}
+                session_skill = session_skills.pop() if len(session_skills) == 1 else None
+                try:
+                    summary_line["analysis"] = await asyncio.wait_for(
+                        run_llm(generate_coaching, combined, session_skill), config.COACHING_BUDGET_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    summary_line["message"] = "Coaching took too long."
+                except Exception as e:
+                    summary_line["message"] = f"Coaching failed: {e}"
+            yield json.dumps(summary_line) + "\n"
+
+    return ClosingStreamingResponse(results(), on_close=close, media_type="application/x-ndjson")
+
+@app.post("/analyze/video")
+async def analyze_video_upload(request: Request):
+    video_path = None
+
+    try:
+        form_data = await request.form()
+        uploaded_file = form_data.get("file")
+        selected_skill = form_data.get("skill_id")
+        frame_stride = form_data.get("frame_stride")
+
+        if not uploaded_file or not hasattr(uploaded_file, 'read'):
+            return JSONResponse(status_code=400, content={"message": "File not found in request."})
+
+        # OpenCV decodes video from a path, so stream the upload to disk
+        # chunk by chunk instead of holding it in memory.
+        suffix = os.path.splitext(uploaded_file.filename or "")[1] or ".mp4"
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as video_file:
+            video_path = video_file.name
+            while chunk := await uploaded_file.read(config.VIDEO_UPLOAD_CHUNK_BYTES):
+                video_file.write(chunk)
+        await uploaded_file.close()
+
+        # The video itself stays on disk; its full-resolution decoded frames count against the budget
+        frame_size = await asyncio.to_thread(video_analyzer.probe_frame_size, video_path)
+        async with admission.admit(estimate_video_memory(frame_size)):
+            video_result = await run_cpu(
+                video_analyzer.analyze_video,
+                video_path,
+                selected_skill,
+                int(frame_stride) if frame_stride else None,
+            )
+            if form_data.get("user_id"):
+                history_store.record_video(form_data["user_id"], video_result)
+
+        # One coaching call for the whole clip, not one per frame, made after the
+        # admission slot is released. Past the budget, or if the call fails, the
+        # deterministic summary is returned as is.
+        summary = video_result.pop("summary")
+        try:
+            coaching = await asyncio.wait_for(run_llm(call_llm, summary, selected_skill), config.COACHING_BUDGET_SECONDS)
+            coaching_source = "llm"
+        except Exception as e:
+            logger.warning("Using the video summary as coaching", extra={"skill": selected_skill, "reason": str(e) or type(e).__name__})
+            coaching, coaching_source = summary, "fallback"
+
+        return JSONResponse(content={
+            "analysis": coaching,
+            "coachingSource": coaching_source,
+            "score": video_result["average_score"],
+            "longestHold": video_result["longest_hold"],
+            "timeline": video_result["timeline"],
+            "fps": video_result["fps"],
+            "frameStride": video_result["frame_stride"],
+            "framesSampled": video_result["frames_sampled"],
+            "framesWithPose": video_result["frames_with_pose"],
+        })
+
+    except OverloadedError as e:
+        return overloaded_response(e)
+
+    except UploadTooLargeError:
+        raise
+
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+    except Exception as e:
+        logger.exception("An error occurred during video processing")
+        return JSONResponse(status_code=500, content={"message": f"An unexpected error occurred: {e}"})
+
+    finally:
+        if video_path:
+            os.unlink(video_path)
+
+# Open /live connections; each owns a Pose instance and a thread
+live_sessions_active = 0
+
+@app.websocket("/live")
+async def live_coaching(websocket: WebSocket):
+    """
+    Real-time scoring of a webcam stream.
+
+    Connect with ?skill_id=<skill>, then send each frame as a binary message
+    (JPEG or WebP). The server first sends {"type": "ready"} with the landmark
+    and angle names, then one {"type": "frame"} message per processed frame with
+    landmarks, angles, scores and rolling hold/stability metrics.
+
+    Frames that arrive while the previous one is still being processed replace
+    each other in a single slot, so a client sending faster than inference only
+    ever waits for the newest frame and latency stays bounded. `dropped` counts
+    the skipped frames. No LLM is involved. With &user_id=<id> the session is
+    saved to the attempt history as one attempt when it ends.
+    """
+    global live_sessions_active
+
+    if live_sessions_active >= config.LIVE_MAX_SESSIONS:
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+
+    live_sessions_active += 1
+    loop = asyncio.get_running_loop()
+    # One thread per session: the tracking Pose instance must always be used from the same thread
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live")
+    session = None
+    receiver = None
+
+    try:
+        await websocket.accept()
+        try:
+            session = await loop.run_in_executor(executor, LiveSession, websocket.query_params.get("skill_id"))
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "message": str(e)})
+            await websocket.close(code=1008)
+            return
+
+        await websocket.send_json({
+            "type": "ready",
+            "skill": session.skill,
+            "landmarks": list(ALL_LANDMARK_NAMES),
+            "angles": list(session.compiled.angle_names),
+        })
+
+        latest_frame = asyncio.Queue(maxsize=1)
+        counts = {"received": 0, "dropped": 0}
+
+        async def receive_frames():
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    frame_bytes = message.get("bytes")
+                    if not frame_bytes or len(frame_bytes) > config.LIVE_MAX_FRAME_BYTES:
+                        continue
+                    counts["received"] += 1
+                    if latest_frame.full():
+                        latest_frame.get_nowait()
+                        counts["dropped"] += 1
+                        LIVE_FRAMES.inc(result="dropped")
+                    latest_frame.put_nowait((counts["received"], frame_bytes, time.monotonic()))
+            finally:
+                # Wake the processing loop so it can finish
+                if latest_frame.full():
+                    latest_frame.get_nowait()
+                latest_frame.put_nowait(None)
+
+        receiver = asyncio.create_task(receive_frames())
+
+        while (frame := await latest_frame.get()) is not None:
+            sequence, frame_bytes, received_at = frame
+            try:
+                result = await loop.run_in_executor(executor, session.process_frame, frame_bytes, received_at)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "seq": sequence, "message": str(e)})
+                continue
+
+            LIVE_FRAMES.inc(result="processed")
+            await websocket.send_json({
+                "type": "frame",
+                "seq": sequence,
+                "dropped": counts["dropped"],
+                "latency_ms": round((time.monotonic() - received_at) * 1000, 1),
+                **result,
+            })
+
+    except (WebSocketDisconnect, RuntimeError):
+        # The client went away while we were sending
+        pass
+
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        if session is not None:
+            if websocket.query_params.get("user_id"):
+                history_store.record_live(websocket.query_params["user_id"], session)
+            executor.submit(session.close)
+        executor.shutdown(wait=False)
+        live_sessions_active -= 1
@@ -0,0 +1,313 @@
+"""
+Offline benchmark suite for the analysis pipeline.
+
+Runs every stage of the backend on CPU with no network access: pose detection
+over a corpus of sample images at several resolutions, angle math and skill
+scoring over synthetic landmark sets for every skill in SKILL_RULES, ranking a
+pose against the whole catalogue, and the full analyze() pipeline with the
+Gemini call replaced by a local stub.
+
+Usage (from the backend directory):
+    python benchmarks/run_benchmarks.py                      # run and compare against baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline    # record a new baseline on this machine
+    python benchmarks/run_benchmarks.py --check              # CI gate: the first run records the baseline
+    python benchmarks/run_benchmarks.py --stages scoring,analyze --llm-latency-ms 50
+
+Exits with status 1 when a stage's p50 or p95 latency regresses by more than
+--tolerance (default 25%), or peak RSS by more than --rss-tolerance (default
+25%), against the stored baseline. Peak RSS depends on which stages ran, so it
+is recorded and compared per stage selection. With --check, a run with no
+baseline (or no baseline entry for the stages that ran) records one from its own
+results and says so, and every later run is compared against it; keep
+baseline.json between CI runs (e.g. in the CI cache) so the gate has something
+to compare with.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+
+import analyze
+from calculate_angle import calculate_angle
+from calculate_skill_score import calculate_skill_score
+from coaching_cache import CoachingCache
+from landmarks import LANDMARK_NAMES, NUM_LANDMARKS
+from rule_engine import evaluate
+from rule_registry import rule_registry
+from skill_ranking import rank_skills
+
+# Benchmark one fixed rules snapshot even if skill_rules.json changes mid-run
+RULES = rule_registry.snapshot
+SKILL_RULES = RULES.raw
+COMPILED_RULES = RULES.compiled
+
+REPO_ROOT = os.path.dirname(BACKEND_DIR)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Sample photos checked into the repo, re-encoded at each benchmark resolution
+CORPUS = [
+    os.path.join(REPO_ROOT, "public", "calisthenics-athlete-performing-perfect-planche-on.jpg"),
+    os.path.join(REPO_ROOT, "public", "analyzed-calisthenics-movement.jpg"),
+    os.path.join(REPO_ROOT, "public", "calisthenics-skill-analysis-overlay.jpg"),
+]
+RESOLUTIONS = (640, 1280, 2560, 4032)
+
+ALL_STAGES = ("pose", "angle", "scoring", "vectorized", "ranking", "analyze")
+
+def load_corpus():
+    """Encode every corpus image at every resolution, keyed by "<name>@<long side>"."""
+    images = {}
+    for path in CORPUS:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise FileNotFoundError(f"Benchmark corpus image missing: {path}")
+        name = os.path.splitext(os.path.basename(path))[0]
+        for long_side in RESOLUTIONS:
+            ratio = long_side / max(image.shape[:2])
+            resized = cv2.resize(image, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_CUBIC)
+            ok, buffer = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            images[f"{name}@{long_side}"] = buffer.tobytes()
+    return images
+
+def synthetic_landmarks(count, seed=0):
+    """Deterministic landmark dicts in a 1000x1000 frame, with roughly 2% of points missing."""
+    rng = random.Random(seed)
+    landmark_sets = []
+    for _ in range(count):
+        landmark_sets.append({
+            name: (rng.uniform(0, 1000), rng.uniform(0, 1000))
+            for name in LANDMARK_NAMES
+            if rng.random() > 0.02
+        })
+    return landmark_sets
+
+def summarize(samples, ops_per_sample=1):
+    """Latency percentiles in ms and throughput in ops/s for a list of per-call durations (seconds)."""
+    timings = np.array(samples)
+    total = timings.sum()
+    return {
+        "count": len(samples),
+        "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 4),
+        "p95_ms": round(float(np.percentile(timings, 95)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(timings, 99)) * 1000, 4),
+        "throughput_per_s": round(len(samples) * ops_per_sample / total, 1) if total else None,
+    }
+
+def time_calls(fn, inputs, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_pose(corpus, repeat):
+    from pose_detector import perform_pose_detection
+    from pose_pool import get_pose_pool
+
+    get_pose_pool()
+    results = {}
+    for long_side in RESOLUTIONS:
+        inputs = [data for key, data in corpus.items() if key.endswith(f"@{long_side}")]
+
+        def detect(data):
+            try:
+                perform_pose_detection(data)
+            except ValueError:
+                # "No human pose detected" still exercises decode and inference
+                pass
+
+        results[f"pose_detection@{long_side}"] = summarize(time_calls(detect, inputs, repeat))
+    return results
+
+def bench_angle(count):
+    rng = random.Random(1)
+    triples = [tuple((rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(3)) for _ in range(count)]
+    return {"calculate_angle": summarize(time_calls(lambda triple: calculate_angle(*triple), triples))}
+
+def bench_scoring(landmark_sets):
+    results = {}
+    for skill in SKILL_RULES:
+        samples = time_calls(lambda landmarks: calculate_skill_score(skill, landmarks, SKILL_RULES), landmark_sets)
+        results[f"calculate_skill_score[{skill}]"] = summarize(samples)
+
+    all_samples = []
+    for skill in SKILL_RULES:
+        all_samples += time_calls(lambda landmarks: calculate_skill_score(skill, landmarks, SKILL_RULES), landmark_sets)
+    results["calculate_skill_score"] = summarize(all_samples)
+    return results
+
+def bench_vectorized(frames, repeat):
+    rng = np.random.default_rng(2)
+    points = rng.uniform(0, 1000, size=(frames, NUM_LANDMARKS, 2))
+
+    def evaluate_all(_):
+        for compiled in COMPILED_RULES.values():
+            evaluate(compiled, points)
+
+    samples = time_calls(evaluate_all, range(repeat))
+    return {f"rule_engine.evaluate[{frames} frames x all skills]": summarize(samples, ops_per_sample=frames * len(COMPILED_RULES))}
+
+def bench_ranking(landmark_sets):
+    # One pose against the whole catalogue, as done per request when skill_id is omitted
+    samples = time_calls(lambda landmarks: rank_skills(landmarks, RULES), landmark_sets)
+    return {f"rank_skills[{len(SKILL_RULES)} skills]": summarize(samples)}
+
+def bench_analyze(landmark_sets, llm_latency_ms):
+    def stub_coaching(feedback, selected_skill=None):
+        time.sleep(llm_latency_ms / 1000)
+        return "Stubbed coaching response."
+
+    # Stub the LLM and disable the coaching cache so every call takes the full path
+    original = analyze.generate_coaching, analyze.coaching_cache
+    analyze.generate_coaching = stub_coaching
+    analyze.coaching_cache = CoachingCache(0, 0)
+    try:
+        samples = []
+        for skill in SKILL_RULES:
+            samples += time_calls(lambda landmarks: analyze.analyze(skill, landmarks), landmark_sets)
+    finally:
+        analyze.generate_coaching, analyze.coaching_cache = original
+
+    return {f"analyze[llm stub {llm_latency_ms}ms]": summarize(samples)}
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline, and the number of stages it covered."""
+    regressions = []
+    compared = 0
+    for stage, stats in results.items():
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+        compared += 1
+        for metric in ("p50_ms", "p95_ms"):
+            if reference[metric] and stats[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{stage} {metric}: {stats[metric]:.3f} ms vs baseline {reference[metric]:.3f} ms "
+                    f"(+{100 * (stats[metric] / reference[metric] - 1):.0f}%)"
+                )
+    return regressions, compared
+
+def rss_key(stages):
+    """Baseline key for the peak RSS of one stage selection."""
+    return ",".join(sorted(stages))
+
+def compare_rss(peak_rss_mb, stages, baseline, tolerance):
+    """Return a regression message if peak RSS grew past the tolerance, None otherwise (or without a baseline)."""
+    reference = baseline.get("peak_rss_mb", {}).get(rss_key(stages))
+    if reference and peak_rss_mb > reference * (1 + tolerance):
+        return (
+            f"peak RSS [{rss_key(stages)}]: {peak_rss_mb:.1f} MB vs baseline {reference:.1f} MB "
+            f"(+{100 * (peak_rss_mb / reference - 1):.0f}%)"
+        )
+    return None
+
+def write_baseline(path, results, stages, peak_rss_mb):
+    """Merge this run's stage results and peak RSS into the baseline file, keeping entries for other stages."""
+    baseline = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+    baseline.update(results)
+    baseline.setdefault("peak_rss_mb", {})[rss_key(stages)] = round(peak_rss_mb, 1)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(ALL_STAGES), help=f"Comma-separated subset of: {', '.join(ALL_STAGES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the image corpus")
+    parser.add_argument("--landmark-sets", type=int, default=200, help="Synthetic landmark sets per skill")
+    parser.add_argument("--frames", type=int, default=900, help="Frames per batched rule-engine pass")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latency of the stubbed LLM call")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p50/p95 slowdown")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25, help="Allowed relative peak RSS growth")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Record the baseline when there is none to compare against")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    landmark_sets = synthetic_landmarks(args.landmark_sets)
+    results = {}
+
+    if "pose" in stages:
+        results.update(bench_pose(load_corpus(), args.repeat))
+    if "angle" in stages:
+        results.update(bench_angle(args.landmark_sets * 50))
+    if "scoring" in stages:
+        results.update(bench_scoring(landmark_sets))
+    if "vectorized" in stages:
+        results.update(bench_vectorized(args.frames, args.repeat * 4))
+    if "ranking" in stages:
+        results.update(bench_ranking(landmark_sets))
+    if "analyze" in stages:
+        results.update(bench_analyze(landmark_sets, args.llm_latency_ms))
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    if args.json:
+        print(json.dumps({"stages": results, "peak_rss_mb": round(peak_rss_mb, 1)}, indent=2))
+    else:
+        print(f"{'stage':<58}{'count':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>13}")
+        for stage, stats in results.items():
+            print(
+                f"{stage:<58}{stats['count']:>8}{stats['p50_ms']:>11.3f}{stats['p95_ms']:>11.3f}"
+                f"{stats['p99_ms']:>11.3f}{stats['throughput_per_s'] or 0:>13.1f}"
+            )
+        print(f"\npeak RSS: {peak_rss_mb:.1f} MB")
+
+    if args.update_baseline:
+        write_baseline(args.baseline, results, stages, peak_rss_mb)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        if args.check:
+            write_baseline(args.baseline, results, stages, peak_rss_mb)
+            print(f"\nNo baseline at {args.baseline}: recorded one from this run. Nothing was compared; later --check runs compare against it.")
+        else:
+            print(f"No baseline at {args.baseline}; run with --update-baseline (or --check) to record one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions, compared = compare(results, baseline, args.tolerance)
+    if compared == 0:
+        if args.check:
+            write_baseline(args.baseline, results, stages, peak_rss_mb)
+            print(f"\nThe baseline at {args.baseline} had no entries for these stages: recorded them from this run. Nothing was compared.")
+        else:
+            print(f"The baseline at {args.baseline} has no entries for these stages; run with --update-baseline.")
+        return 0
+
+    rss_regression = compare_rss(peak_rss_mb, stages, baseline, args.rss_tolerance)
+    if rss_regression:
+        regressions.append(rss_regression)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nNo regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,25 @@
 import math
-import numpy as np
 
 def calculate_angle(a, b, c):
-    
-    # Convert points to numpy arrays
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-    
+    """
+    Angle at vertex b formed by points a-b-c, in degrees.
+
+    Plain float math: for a single triple this is several times faster than
+    building NumPy arrays. Batched work goes through rule_engine.compute_angles.
+    """
     # Create vectors pointing away from the vertex b
     # ba = a - b
     # bc = c - b
-    ba = a - b
-    bc = c - b
-    
+    ba_x, ba_y = a[0] - b[0], a[1] - b[1]
+    bc_x, bc_y = c[0] - b[0], c[1] - b[1]
+
+    norms = math.hypot(ba_x, ba_y) * math.hypot(bc_x, bc_y)
+    if norms == 0.0:
+        # Coinciding landmarks leave the angle undefined; callers treat NaN as unmeasurable
+        return float("nan")
+
     # Calculate the dot product and the cosine of the angle
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    
-    # Calculate the angle in radians AND convert to degrees
-    angle = np.arccos(cosine_angle)
-    
-    return np.degrees(angle)
+    cosine_angle = (ba_x * bc_x + ba_y * bc_y) / norms
+
+    # Clamp against floating point drift, then convert radians to degrees
+    return math.degrees(math.acos(max(-1.0, min(1.0, cosine_angle))))
@@ -1,5 +1,9 @@
 import math
-from calculate_angle import calculate_angle
+import numpy as np
+
+from landmarks import landmarks_to_array
+from rule_engine import CompiledSkill, evaluate
+from rule_registry import rule_registry
 
 def calculate_angle_score(calculated_angle, min_angle, max_angle, tolerance=15):
     """
@@ -30,6 +34,123 @@ def calculate_angle_score(calculated_angle, min_angle, max_angle, tolerance=15):
     # Ensure score is between 0 and 100
     return max(0.0, min(100.0, score))
 
+class AngleResult:
+    """
+    Outcome of checking one angle rule against a detected pose.
+
+    This is computed once per analysis; the score payload, the short feedback text
+    and the structured API response are all rendered from it.
+
+    status is one of "in_range", "out_of_range", "missing" (landmarks not detected)
+    or "error" (degenerate geometry, e.g. two points on top of each other).
+    """
+
+    __slots__ = ("name", "points", "min_angle", "max_angle", "angle", "score", "status", "missing_points")
+
+    def __init__(self, name, points, min_angle, max_angle, angle=None, score=0.0, status="missing", missing_points=()):
+        self.name = name
+        self.points = points
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.angle = angle
+        self.score = score
+        self.status = status
+        self.missing_points = missing_points
+
+    def score_entry(self):
+        """Entry for score_data["angle_scores"]."""
+        if self.status == "missing":
+            status = f"Missing landmarks: {', '.join(self.missing_points)}"
+        elif self.status == "error":
+            status = "Calculation error: points overlap"
+        else:
+            status = self.status
+
+        return {
+            "score": round(self.score, 1),
+            "calculated_angle": None if self.angle is None else round(self.angle, 1),
+            "target_range": [self.min_angle, self.max_angle],
+            "status": status
+        }
+
+    def feedback_line(self):
+        """One line of the short analysis text handed to the LLM."""
+        if self.status == "missing":
+            return f"Could not check {self.name} because the following points were not detected: {', '.join(self.missing_points)}."
+        if self.status == "error":
+            return f"Could not check {self.name} because the measured points overlap."
+        if self.status == "in_range":
+            return f"{self.name}: Your angle is {self.angle:.1f}°, which is in the ideal range of {self.min_angle}-{self.max_angle}°."
+        return f"{self.name}: Your angle is {self.angle:.1f}°. Try to aim for the ideal range of {self.min_angle}-{self.max_angle}°."
+
+    def to_dict(self):
+        """Structured form for clients that render their own feedback."""
+        return {
+            "name": self.name,
+            "points": list(self.points),
+            "calculated_angle": None if self.angle is None else round(self.angle, 1),
+            "target_range": [self.min_angle, self.max_angle],
+            "score": round(self.score, 1),
+            "status": self.status,
+            "missing_points": list(self.missing_points)
+        }
+
+def evaluate_skill(selected_skill, landmarks, skill_rules=None):
+    """
+    Check every angle rule of a skill in a single vectorized pass.
+
+    Args:
+        selected_skill (str): Name of the skill being analyzed (must exist in skill_rules)
+        landmarks (dict): Dictionary of body landmark coordinates
+        skill_rules (dict): Skill configuration with angle requirements (default: the live rule registry)
+
+    Returns:
+        tuple: (list of AngleResult in rule order, overall score as the mean of measurable angles)
+    """
+    # Reuse the precompiled rules for the live registry, compile ad-hoc rule sets on the fly
+    snapshot = rule_registry.snapshot
+    if skill_rules is None:
+        skill_rules = snapshot.raw
+    compiled = snapshot.compiled.get(selected_skill) if skill_rules is snapshot.raw else None
+    if compiled is None:
+        compiled = CompiledSkill(selected_skill, skill_rules[selected_skill])
+
+    result = evaluate(compiled, landmarks_to_array(landmarks))
+    angles, scores = result["angles"][0], result["scores"][0]
+    in_range, point_missing = result["in_range"][0], result["point_missing"][0]
+
+    angle_results = []
+    for i, angle_rule in enumerate(skill_rules[selected_skill]["angles_to_check"]):
+        angle_result = AngleResult(angle_rule["name"], compiled.point_names[i], angle_rule["min"], angle_rule["max"])
+
+        if point_missing[i].any():
+            angle_result.missing_points = tuple(name for name, missing in zip(compiled.point_names[i], point_missing[i]) if missing)
+        elif np.isnan(angles[i]):
+            angle_result.status = "error"
+        else:
+            angle_result.angle = float(angles[i])
+            angle_result.score = float(scores[i])
+            angle_result.status = "in_range" if in_range[i] else "out_of_range"
+
+        angle_results.append(angle_result)
+
+    return angle_results, float(result["overall"][0])
+
+# Overall score from which an attempt counts as a pass
+PASSING_SCORE = 65.0
+
+def build_score_data(angle_results, overall_score):
+    """Render the score payload returned by the API from `evaluate_skill` output."""
+    missing_landmarks = {name for angle_result in angle_results for name in angle_result.missing_points}
+
+    return {
+        "overall_score": round(overall_score, 1),
+        "angle_scores": {angle_result.name: angle_result.score_entry() for angle_result in angle_results},
+        "missing_landmarks": list(missing_landmarks),
+        "passing_threshold": PASSING_SCORE,
+        "is_passing": overall_score >= PASSING_SCORE
+    }
+
 def calculate_skill_score(selected_skill, landmarks, skill_rules):
     """
     Calculate overall skill performance score based on all angle measurements.
@@ -49,66 +170,5 @@ def calculate_skill_score(selected_skill, landmarks, skill_rules):
             "missing_landmarks": [],
             "error": f"Skill '{selected_skill}' not found in rules"
         }
-    
-    rules = skill_rules[selected_skill]
-    angle_scores = {}
-    missing_landmarks = []
-    valid_scores = []
-    
-    for angle_rule in rules["angles_to_check"]:
-        angle_name = angle_rule["name"]
-        p1_name, p2_name, p3_name = angle_rule["points"]
-        min_angle, max_angle = angle_rule["min"], angle_rule["max"]
-        
-        # Get coordinates for the three points
-        p1 = landmarks.get(p1_name)
-        p2 = landmarks.get(p2_name) 
-        p3 = landmarks.get(p3_name)
-        
-        # Check if all landmarks are available
-        if not all([p1, p2, p3]):
-            missing_points = [name for name, point in zip([p1_name, p2_name, p3_name], [p1, p2, p3]) if not point]
-            missing_landmarks.extend(missing_points)
-            angle_scores[angle_name] = {
-                "score": 0.0,
-                "calculated_angle": None,
-                "target_range": [min_angle, max_angle],
-                "status": f"Missing landmarks: {', '.join(missing_points)}"
-            }
-            continue
-        
-        # Calculate the angle
-        try:
-            calculated_angle = calculate_angle(p1, p2, p3)
-            score = calculate_angle_score(calculated_angle, min_angle, max_angle)
-            
-            angle_scores[angle_name] = {
-                "score": round(score, 1),
-                "calculated_angle": round(calculated_angle, 1),
-                "target_range": [min_angle, max_angle],
-                "status": "in_range" if min_angle <= calculated_angle <= max_angle else "out_of_range"
-            }
-            
-            valid_scores.append(score)
-            
-        except Exception as e:
-            angle_scores[angle_name] = {
-                "score": 0.0,
-                "calculated_angle": None,
-                "target_range": [min_angle, max_angle],
-                "status": f"Calculation error: {str(e)}"
-            }
-    
-    # Calculate overall score as average of valid angle scores
-    if valid_scores:
-        overall_score = sum(valid_scores) / len(valid_scores)
-    else:
-        overall_score = 0.0
-    
-    return {
-        "overall_score": round(overall_score, 1),
-        "angle_scores": angle_scores,
-        "missing_landmarks": list(set(missing_landmarks)),  # Remove duplicates
-        "passing_threshold": 65.0,
-        "is_passing": overall_score >= 65.0
-    }
+
+    return build_score_data(*evaluate_skill(selected_skill, landmarks, skill_rules))
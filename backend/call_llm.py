@@ -1,142 +1,232 @@
 from google import genai
 from google.genai import types
+import asyncio
+import logging
 import os
-import cv2
-import numpy as np
+import threading
+import time
 from dotenv import load_dotenv
 
-from skill_rules import SKILL_RULES
-
-SYSTEM_INSTRUCTIONS = """
-You are FRIEND, an expert AI Calisthenics and Bodyweight Fitness Coach with deep knowledge of biomechanics, progressive training, and injury prevention. Your primary goal is to provide safe, encouraging, and highly personalized form feedback to users by interpreting calculated joint angles from their exercise performance.
-
-Your tone should be knowledgeable, positive, and motivating. Always prioritize safety and proper form over progression speed.
-
-YOUR MISSION
-You will receive the name of a calisthenics skill and computer vision analysis results (calculated angles). Your mission is to synthesize this data into cohesive, actionable coaching that goes beyond stating numbers—you must interpret them contextually and provide expert guidance as if you've observed their form directly.
-
-INPUT FORMAT
-SKILL_NAME: [Name of skill, e.g., "tuck_planche"]
-USER_LEVEL: [beginner/intermediate/advanced] (if provided)
-PREVIOUS_ATTEMPTS: [number] (if provided)
-
-ANALYSIS_RESULTS:
-Shoulder Angle: Your angle is 75.0°. Try to aim for the ideal range of 30-60°.
-Elbow Angle: Your angle is 178.2°, which is in the ideal range of 175-180°.
-Hip Angle: Your angle is 40.0°. Try to aim for the ideal range of 45-70°.
-Knee Angle: Your angle is 45.5°, which is in the ideal range of 30-60°.
-
-TECHNICAL SPECIFICATIONS & SKILL RULES
-Based on the computer vision system, here are the precise angle requirements for each skill:
-
-{SKILL_RULES}
-
-OUTPUT STRUCTURE (Required Sections)
-Overall Assessment & Encouragement
-
-Lead with genuine positivity about their attempt
-One-sentence performance summary based on analysis
-Acknowledge the difficulty of their chosen skill
-
-What You're Doing Well (Strengths)
-
-Highlight ALL positive markers from input
-Explain WHY each correct angle matters for the skill using the technical specs above
-Connect good form to strength development and safety
-
-Areas for Improvement
-
-Address each ❌ marker with biomechanical insight using the angle meanings above
-Don't repeat numbers—interpret what the angle tells you about their body position
-Explain how the incorrect angle affects performance and safety
-Reference the ideal ranges and what they represent physically
-
-Actionable Next Steps
-
-2-3 specific, progressive drills or cues
-Include regression options if angles are significantly outside ideal ranges
-Suggest hold times, rep ranges, or frequency when appropriate
-Mention complementary exercises if relevant
-
-Progression Pathway
-
-Brief mention of what comes next in their journey
-Prerequisites they should master first (if applicable)
-Realistic timeline expectations based on current form
-
-Safety & Recovery Notes
-
-Highlight any form issues that could lead to injury
-Special attention to elbow and shoulder angles for joint protection
-Suggest rest periods, warm-up considerations
-
-ENHANCED COACHING PRINCIPLES
-Angle Interpretation Guide
-When analyzing angles, always translate the numbers into physical meaning:
-Shoulder Angles:
-
-Lower values in planches = more forward lean (good)
-Higher values in front levers = more upright position (good)
-Back lever angles are unique due to face-down position
-
-Elbow Angles:
-
-175-180° = locked arms (essential for safety and strength)
-Below 165° = significant bend (usually indicates insufficient strength)
-
-Hip/Knee Angles:
-
-Low values (30-70°) = tucked positions
-High values (175-180°) = straight/extended positions
-Mid-range (85-100°) = partially open positions
-
-Progressive Coaching
-
-If angles are far outside ranges, suggest regression
-If angles are close but not perfect, provide specific cues
-Only suggest progression when current skill is mastered
-
-Safety-First Approach
-
-Always prioritize elbow lockout (175-180°) for joint safety
-Watch for excessive shoulder angles that could indicate overreaching
-Emphasize control over holding time
-
-RESPONSE QUALITY CHECKLIST
-Before finalizing your response, ensure:
-
- You've interpreted angles as body positions, not just restated numbers
- Each strength explains why that angle range is beneficial
- Each issue translates the angle into what their body is doing wrong
- Drills target the specific angle deficiencies identified
- Safety considerations address joint angles particularly
- Tone is encouraging but technically accurate
-
-MANDATORY SAFETY DISCLAIMER
-Always end with this exact disclaimer:
-
-⚠️ Disclaimer: I am AI and not a professional coach. Always listen to your body and stop if you feel pain. Consult a qualified professional for medical advice or if you are new to these exercises. Start with proper progressions and never sacrifice form for advancement speed.
-
-EXAMPLE COACHING LANGUAGE
-Instead of: "Your shoulder angle is 75°, aim for 30-60°"
-Say: "Your shoulder angle of 75° tells me you're not leaning forward enough into the planche position. In tuck planche, that 30-60° range means your shoulders should be significantly in front of your hands—this creates the specific strength demand and proper loading pattern. Try focusing on 'pushing the ground away behind you' to increase that forward lean."
-Remember: You are their knowledgeable friend who uses precise angle data to give them the most accurate and helpful coaching possible!
-"""
-
-def call_llm(feedback: str):
-    
-    load_dotenv()
-    api_key = os.getenv("GOOGLE_API_KEY")
-    client = genai.Client(api_key = api_key)
-    
-    response = client.models.generate_content(
-        model="gemini-1.5-flash", 
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_INSTRUCTIONS
-        ),
-        contents=feedback,
-    )
-    
-    total_response = "**SHORT SUMMARY:**\n" + feedback + "\n\n" + "**IN-DEPTH ANALYSIS:**\n" + response.text
-    
-    return total_response
+import config
+from coaching_prompts import system_prompt
+from metrics import timed, LLM_TOKENS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Pinned model version: context caches are tied to one exact model version
+MODEL_NAME = "gemini-2.0-flash-001"
+# Smallest prompt the model accepts for context caching; shorter prompts are always sent inline
+CONTEXT_CACHE_MIN_TOKENS = 4096
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the shared Gemini client, reading the API key from .env only once."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                load_dotenv()
+                _client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    return _client
+
+# (rules_version, skill) -> (context cache name or None, monotonic expiry, consecutive failures)
+_context_caches = {}
+# Guards the two dicts only; never held across a network call
+_context_cache_lock = threading.Lock()
+# (rules_version, skill) -> lock held by the one thread creating that cache
+_creation_locks = {}
+
+# Failed creations are retried after 60 s, then 2, 4, 8... minutes, up to 6 hours
+CONTEXT_CACHE_RETRY_SECONDS = 60
+CONTEXT_CACHE_RETRY_MAX_SECONDS = 6 * 3600
+
+def _fresh_entry(prompt_key):
+    entry = _context_caches.get(prompt_key)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry
+    return None
+
+def _count_tokens(prompt):
+    """Token count of a prompt for MODEL_NAME, estimated at ~4 characters per token when the count call fails."""
+    try:
+        return get_client().models.count_tokens(model=MODEL_NAME, contents=prompt).total_tokens
+    except Exception as e:
+        logger.warning("Could not count prompt tokens, estimating", extra={"error": str(e)})
+        return len(prompt) // 4
+
+def _context_cache_name(prompt_key, prompt):
+    """
+    Return the name of a server-side context cache holding `prompt`, creating it on first use.
+
+    Only one thread creates a given cache; callers arriving meanwhile, and
+    callers whose creation failed recently, get None and send the prompt
+    inline instead of waiting. Prompts below the model's minimum cacheable
+    size are never sent for caching; other failures are retried with an
+    exponential back-off. When the rules version changes, the caches of older
+    versions are deleted on the server.
+    """
+    if not config.LLM_CONTEXT_CACHE:
+        return None
+
+    entry = _fresh_entry(prompt_key)
+    if entry is not None:
+        return entry[0]
+
+    with _context_cache_lock:
+        creation_lock = _creation_locks.setdefault(prompt_key, threading.Lock())
+    if not creation_lock.acquire(blocking=False):
+        return None
+
+    try:
+        entry = _fresh_entry(prompt_key)
+        if entry is not None:
+            return entry[0]
+
+        ttl = config.LLM_CONTEXT_CACHE_TTL_SECONDS
+        rules_version, selected_skill = prompt_key
+        prompt_tokens = _count_tokens(prompt)
+        try:
+            if prompt_tokens < CONTEXT_CACHE_MIN_TOKENS:
+                # The prompt under this key never changes, so there is nothing to retry
+                new_entry = (None, float("inf"), 0)
+                logger.info("Coaching prompt below the minimum cacheable size, sending it inline", extra={
+                    "skill": selected_skill, "prompt_tokens": prompt_tokens, "min_tokens": CONTEXT_CACHE_MIN_TOKENS,
+                })
+            else:
+                cache = get_client().caches.create(
+                    model=MODEL_NAME,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=prompt,
+                        ttl=f"{ttl}s",
+                        display_name=f"coaching-{selected_skill or 'generic'}-v{rules_version}",
+                    ),
+                )
+                # Renew a little before the server expires it
+                new_entry = (cache.name, time.monotonic() + ttl * 0.9, 0)
+                logger.info("Created coaching context cache", extra={"skill": selected_skill, "cache": cache.name})
+        except Exception as e:
+            previous = _context_caches.get(prompt_key)
+            failures = previous[2] if previous is not None else 0
+            retry = min(CONTEXT_CACHE_RETRY_SECONDS * 2 ** failures, CONTEXT_CACHE_RETRY_MAX_SECONDS)
+            new_entry = (None, time.monotonic() + retry, failures + 1)
+            logger.warning("Context caching unavailable, sending the prompt inline", extra={
+                "skill": selected_skill, "error": str(e), "retry_seconds": retry,
+            })
+
+        with _context_cache_lock:
+            superseded = [key for key in _context_caches if key[0] != rules_version]
+            superseded_names = [_context_caches.pop(key)[0] for key in superseded]
+            for key in superseded:
+                _creation_locks.pop(key, None)
+            _context_caches[prompt_key] = new_entry
+    finally:
+        creation_lock.release()
+
+    _delete_context_caches([name for name in superseded_names if name is not None])
+    return new_entry[0]
+
+def _delete_context_caches(names):
+    """Best-effort deletion of server-side caches built from superseded rules."""
+    for name in names:
+        try:
+            get_client().caches.delete(name=name)
+            logger.info("Deleted superseded coaching context cache", extra={"cache": name})
+        except Exception as e:
+            logger.warning("Could not delete superseded context cache", extra={"cache": name, "error": str(e)})
+
+def coaching_config(selected_skill=None):
+    """
+    Generation config for one coaching call: the skill's cached prompt when available, otherwise the prompt inline.
+
+    Returns:
+        tuple: (prompt key, types.GenerateContentConfig)
+    """
+    prompt_key, prompt = system_prompt(selected_skill)
+    cache_name = _context_cache_name(prompt_key, prompt)
+    if cache_name is not None:
+        return prompt_key, types.GenerateContentConfig(cached_content=cache_name)
+    return prompt_key, types.GenerateContentConfig(system_instruction=prompt)
+
+def forget_context_cache(prompt_key):
+    """Drop a context cache entry after a failed call, so the next call recreates it (e.g. after server-side eviction)."""
+    with _context_cache_lock:
+        entry = _context_caches.get(prompt_key)
+        # A failed creation keeps its back-off: the call failed without using a cache
+        if entry is not None and entry[0] is not None:
+            del _context_caches[prompt_key]
+
+def record_usage(selected_skill, usage, seconds, call):
+    """Count the tokens of one Gemini call and log them together with its latency."""
+    input_tokens = (usage.prompt_token_count or 0) if usage else 0
+    cached_tokens = (usage.cached_content_token_count or 0) if usage else 0
+    output_tokens = (usage.candidates_token_count or 0) if usage else 0
+
+    skill_label = selected_skill or "generic"
+    LLM_TOKENS.inc(input_tokens, kind="input", skill=skill_label)
+    LLM_TOKENS.inc(cached_tokens, kind="cached", skill=skill_label)
+    LLM_TOKENS.inc(output_tokens, kind="output", skill=skill_label)
+    logger.info("Coaching call finished", extra={
+        "call": call,
+        "skill": skill_label,
+        "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
+        "output_tokens": output_tokens,
+        "seconds": round(seconds, 3),
+    })
+
+def generate_coaching(feedback: str, selected_skill=None):
+    """Ask Gemini for the in-depth coaching text for a short analysis summary."""
+    prompt_key, generation_config = coaching_config(selected_skill)
+    start = time.perf_counter()
+    try:
+        with timed("llm"):
+            response = get_client().models.generate_content(
+                model=MODEL_NAME,
+                config=generation_config,
+                contents=feedback,
+            )
+    except Exception:
+        forget_context_cache(prompt_key)
+        raise
+    record_usage(selected_skill, response.usage_metadata, time.perf_counter() - start, "generate")
+
+    return response.text
+
+async def stream_coaching(feedback: str, selected_skill=None):
+    """Async variant of `generate_coaching` that yields the coaching text chunk by chunk as Gemini produces it."""
+    # Building the config may create a context cache over the network, so keep it off the event loop
+    prompt_key, generation_config = await asyncio.to_thread(coaching_config, selected_skill)
+    start = time.perf_counter()
+    first_token = True
+    usage = None
+    try:
+        with timed("llm_stream"):
+            stream = await get_client().aio.models.generate_content_stream(
+                model=MODEL_NAME,
+                config=generation_config,
+                contents=feedback,
+            )
+            async for chunk in stream:
+                # Usage arrives with the final chunk(s)
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    if first_token:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+                        first_token = False
+                    yield chunk.text
+    except Exception:
+        forget_context_cache(prompt_key)
+        raise
+    record_usage(selected_skill, usage, time.perf_counter() - start, "stream")
+
+def coaching_prefix(feedback: str):
+    return "**SHORT SUMMARY:**\n" + feedback + "\n\n" + "**IN-DEPTH ANALYSIS:**\n"
+
+def format_coaching(feedback: str, coaching: str):
+    """Combine the short analysis summary with the LLM's in-depth coaching."""
+    return coaching_prefix(feedback) + coaching
+
+def call_llm(feedback: str, selected_skill=None):
+    return format_coaching(feedback, generate_coaching(feedback, selected_skill))
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+def form_signature(selected_skill, angles, rules_version, bucket_degrees=None):
+    """
+    Cache key for a form: the skill, the rules version, and each angle's status and quantized value.
+
+    Args:
+        selected_skill (str): Name of the skill being analyzed
+        angles (list): Structured per-angle results (AngleResult.to_dict())
+        rules_version (int): Skill rules version, so coaching written for old ranges is not reused
+        bucket_degrees (float): Bucket width used to quantize angles (default: COACHING_CACHE_BUCKET_DEGREES)
+
+    Returns:
+        str: Stable hex digest identifying "the same form" for coaching purposes
+    """
+    bucket_degrees = bucket_degrees or config.COACHING_CACHE_BUCKET_DEGREES
+    parts = [selected_skill, f"rules-v{rules_version}"]
+    for angle in angles:
+        value = angle["calculated_angle"]
+        bucket = "-" if value is None else str(int(value // bucket_degrees))
+        parts.append(f"{angle['name']}:{angle['status']}:{bucket}")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+class CoachingCache:
+    """
+    LRU + TTL cache of LLM coaching text, optionally persisted to SQLite.
+
+    The in-memory tier answers most lookups; the SQLite tier (when a path is
+    configured) is write-through and lets the cache survive restarts.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_path = db_path
+        self._db = None
+        # Connections inherited across fork; kept referenced so they are never closed in the child
+        self._inherited_dbs = []
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS coaching_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM coaching_cache WHERE created_at < ?", (time.time() - ttl_seconds,))
+            self._db.commit()
+
+        os.register_at_fork(after_in_child=self._reopen_after_fork)
+
+    def _reopen_after_fork(self):
+        # A SQLite connection must not be used (or closed) across fork, so each process opens its own
+        self._lock = threading.Lock()
+        if self._db is not None:
+            self._inherited_dbs.append(self._db)
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None and self._db is not None:
+                # Empty texts are never cached any more; skip any an older version persisted
+                row = self._db.execute(
+                    "SELECT value, created_at FROM coaching_cache WHERE key = ? AND created_at >= ? AND value != ''",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._store(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        entry = (value, time.time())
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO coaching_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, entry[0], entry[1]),
+                )
+                self._db.commit()
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+coaching_cache = CoachingCache(
+    config.COACHING_CACHE_SIZE,
+    config.COACHING_CACHE_TTL_SECONDS,
+    config.COACHING_CACHE_DB or None,
+)
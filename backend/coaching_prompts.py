@@ -0,0 +1,146 @@
+import threading
+
+from rule_registry import rule_registry
+
+# The coaching system prompt is assembled per skill: the shared coaching
+# instructions plus only the angle rules and interpretation notes that apply to
+# that skill. Prompts are built once per rules version and reused byte-for-byte,
+# so the prefix stays stable for Gemini's context caching.
+
+BASE_INSTRUCTIONS = """
+You are FRIEND, an expert AI Calisthenics and Bodyweight Fitness Coach with deep knowledge of biomechanics, progressive training, and injury prevention. Your primary goal is to provide safe, encouraging, and highly personalized form feedback to users by interpreting calculated joint angles from their exercise performance.
+
+Your tone should be knowledgeable, positive, and motivating. Always prioritize safety and proper form over progression speed.
+
+YOUR MISSION
+You will receive the name of a calisthenics skill and computer vision analysis results (calculated angles). Your mission is to synthesize this data into cohesive, actionable coaching that goes beyond stating numbers—you must interpret them contextually and provide expert guidance as if you've observed their form directly.
+""".strip()
+
+OUTPUT_INSTRUCTIONS = """
+OUTPUT STRUCTURE (Required Sections)
+Overall Assessment & Encouragement
+- Lead with genuine positivity about their attempt
+- One-sentence performance summary based on analysis
+- Acknowledge the difficulty of their chosen skill
+
+What You're Doing Well (Strengths)
+- Highlight ALL positive markers from input
+- Explain WHY each correct angle matters for the skill using the technical specs above
+- Connect good form to strength development and safety
+
+Areas for Improvement
+- Address each angle outside its ideal range with biomechanical insight
+- Don't repeat numbers—interpret what the angle tells you about their body position
+- Explain how the incorrect angle affects performance and safety
+
+Actionable Next Steps
+- 2-3 specific, progressive drills or cues that target the angle deficiencies identified
+- Include regression options if angles are significantly outside ideal ranges
+- Suggest hold times, rep ranges, or frequency when appropriate
+
+Progression Pathway
+- Brief mention of what comes next in their journey
+- Prerequisites they should master first (if applicable)
+- Realistic timeline expectations based on current form
+
+Safety & Recovery Notes
+- Highlight any form issues that could lead to injury, especially at the elbows and shoulders
+- Suggest rest periods, warm-up considerations
+
+COACHING PRINCIPLES
+- Translate angles into body positions instead of restating numbers
+- Elbows: 175-180° = locked arms (essential for safety and strength); below 165° = significant bend (usually insufficient strength)
+- Hips/knees: 30-70° = tucked, 85-100° = partially open, 175-180° = straight/extended
+- If angles are far outside ranges, suggest regression; if close, give specific cues; only suggest progression when the current skill is mastered
+- Emphasize control over holding time
+
+MANDATORY SAFETY DISCLAIMER
+Always end with this exact disclaimer:
+
+⚠️ Disclaimer: I am AI and not a professional coach. Always listen to your body and stop if you feel pain. Consult a qualified professional for medical advice or if you are new to these exercises. Start with proper progressions and never sacrifice form for advancement speed.
+
+Remember: You are their knowledgeable friend who uses precise angle data to give them the most accurate and helpful coaching possible!
+""".strip()
+
+# Interpretation notes per skill family, matched against the skill name
+FAMILY_NOTES = {
+    "planche": (
+        "Lower shoulder angles mean more forward lean (good): the shoulders should travel well in front of the hands. "
+        "Cue: 'push the ground away behind you' to increase the lean."
+    ),
+    "front_lever": "Higher shoulder angles mean a more horizontal, upright body line (good); depress the shoulders and pull the bar towards the hips.",
+    "back_lever": "The body faces the floor, so shoulder angles read differently from the front lever; keep the shoulders open and the chest proud.",
+    "elbow_lever": "The elbows support the hips, so a bent elbow is expected here; the body line from shoulders to feet should stay straight.",
+    "l_sit": "The shoulders must stay depressed with locked arms, and the hips should hold close to 90° with straight knees.",
+}
+
+# Used when one prompt covers several skills (e.g. a batch session summary)
+GENERIC_SKILL_NOTES = (
+    "TECHNICAL SPECIFICATIONS\n"
+    "The analysis results state the ideal range next to every measured angle; interpret each angle against that range."
+)
+
+def skill_family(selected_skill):
+    """Return the FAMILY_NOTES key a skill belongs to, or None."""
+    for family in FAMILY_NOTES:
+        if family in selected_skill:
+            return family
+    return None
+
+def build_system_prompt(selected_skill, rules):
+    """
+    Build the system prompt for one skill.
+
+    Args:
+        selected_skill (str): Skill name, or None for a prompt without skill-specific rules
+        rules (dict): The skill's rules ({"angles_to_check": [...]}), ignored when selected_skill is None
+
+    Returns:
+        str: The complete system instruction
+    """
+    if selected_skill is None:
+        skill_section = GENERIC_SKILL_NOTES
+    else:
+        lines = [
+            f"{angle_rule['name']} ({'-'.join(angle_rule['points'])}): ideal {angle_rule['min']}-{angle_rule['max']}°"
+            for angle_rule in rules["angles_to_check"]
+        ]
+        skill_section = f"TECHNICAL SPECIFICATIONS FOR {selected_skill}\n" + "\n".join(lines)
+        family = skill_family(selected_skill)
+        if family is not None:
+            skill_section += "\n\nAngle interpretation: " + FAMILY_NOTES[family]
+
+    return "\n\n".join((BASE_INSTRUCTIONS, skill_section, OUTPUT_INSTRUCTIONS))
+
+_prompts = (None, {})
+_prompts_lock = threading.Lock()
+
+def build_prompts(snapshot):
+    """Build every skill's prompt (plus the generic one under None) for a rules snapshot."""
+    prompts = {skill: build_system_prompt(skill, rules) for skill, rules in snapshot.raw.items()}
+    prompts[None] = build_system_prompt(None, None)
+    return prompts
+
+def system_prompt(selected_skill):
+    """
+    Return the system prompt for a skill, building all prompts once per rules version.
+
+    Unknown skills get the generic prompt.
+
+    Returns:
+        tuple: ((rules_version, skill or None) identifying the prompt, prompt text)
+    """
+    global _prompts
+    snapshot = rule_registry.snapshot
+    version, prompts = _prompts
+    if version != snapshot.version:
+        with _prompts_lock:
+            version, prompts = _prompts
+            if version != snapshot.version:
+                prompts = build_prompts(snapshot)
+                version = snapshot.version
+                _prompts = (version, prompts)
+
+    if selected_skill not in prompts:
+        selected_skill = None
+    return (version, selected_skill), prompts[selected_skill]
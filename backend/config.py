@@ -0,0 +1,132 @@
+import os
+
+# Runtime tuning knobs for the analysis backend. Every value can be overridden
+# with an environment variable of the same name.
+
+# --- Pose engine ---
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE", "2"))
+POSE_POOL_TIMEOUT = float(os.getenv("POSE_POOL_TIMEOUT", "30"))
+POSE_MIN_DETECTION_CONFIDENCE = float(os.getenv("POSE_MIN_DETECTION_CONFIDENCE", "0.7"))
+POSE_MODEL_COMPLEXITY = int(os.getenv("POSE_MODEL_COMPLEXITY", "1"))
+
+# --- Worker pools ---
+# "thread" keeps everything in one process (MediaPipe and OpenCV release the
+# GIL for most of their work); "process" sidesteps the GIL entirely at the cost
+# of one pose pool per worker process.
+CPU_EXECUTOR = os.getenv("CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "16"))
+
+# --- Admission control ---
+# Requests beyond MAX_CONCURRENT_REQUESTS wait in a queue of at most
+# MAX_QUEUED_REQUESTS; anything past that is rejected with 503 + Retry-After.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", str(CPU_WORKERS * 2)))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", str(CPU_WORKERS * 8)))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "2"))
+# Estimated memory of all admitted requests together (upload plus decode buffers).
+# A request whose estimate does not fit waits in the same queue; 0 disables the budget.
+MEMORY_BUDGET_BYTES = int(os.getenv("MEMORY_BUDGET_BYTES", str(1024 * 1024 * 1024)))
+
+# --- Video analysis ---
+VIDEO_FRAME_STRIDE = int(os.getenv("VIDEO_FRAME_STRIDE", "2"))
+VIDEO_MAX_SAMPLED_FRAMES = int(os.getenv("VIDEO_MAX_SAMPLED_FRAMES", "900"))
+VIDEO_MIN_TRACKING_CONFIDENCE = float(os.getenv("VIDEO_MIN_TRACKING_CONFIDENCE", "0.5"))
+VIDEO_UPLOAD_CHUNK_BYTES = int(os.getenv("VIDEO_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# --- Live sessions (WebSocket) ---
+# Each live connection owns a tracking-mode Pose instance and a thread, so cap them
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", str(CPU_WORKERS)))
+LIVE_INPUT_MAX_SIDE = int(os.getenv("LIVE_INPUT_MAX_SIDE", "640"))
+LIVE_MAX_FRAME_BYTES = int(os.getenv("LIVE_MAX_FRAME_BYTES", str(1024 * 1024)))
+# Frames of history used for the rolling stability metrics
+LIVE_STABILITY_WINDOW = int(os.getenv("LIVE_STABILITY_WINDOW", "30"))
+
+# --- Coaching cache ---
+# Angles are bucketed to COACHING_CACHE_BUCKET_DEGREES before being used as part
+# of the cache key, so near-identical forms share one LLM response.
+COACHING_CACHE_SIZE = int(os.getenv("COACHING_CACHE_SIZE", "2048"))
+COACHING_CACHE_TTL_SECONDS = float(os.getenv("COACHING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+COACHING_CACHE_BUCKET_DEGREES = float(os.getenv("COACHING_CACHE_BUCKET_DEGREES", "5"))
+# Path to a SQLite file to persist the cache across restarts; empty keeps it in memory only
+COACHING_CACHE_DB = os.getenv("COACHING_CACHE_DB", "")
+
+# --- Pose detection cache ---
+# Keyed by a hash of the uploaded bytes, so re-uploads (or the same photo under
+# another skill) skip decode, inference, drawing and encoding entirely.
+POSE_CACHE_MAX_BYTES = int(os.getenv("POSE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# Directory for the optional on-disk tier; empty keeps the cache in memory only
+POSE_CACHE_DIR = os.getenv("POSE_CACHE_DIR", "")
+POSE_CACHE_DISK_MAX_BYTES = int(os.getenv("POSE_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# --- Image preprocessing ---
+# Uploads are decoded at reduced resolution and resized so their longest side is
+# at most POSE_INPUT_MAX_SIDE before inference. The annotated output image is
+# resized/encoded separately with the IMAGE_OUTPUT_* settings.
+POSE_INPUT_MAX_SIDE = int(os.getenv("POSE_INPUT_MAX_SIDE", "1280"))
+IMAGE_OUTPUT_MAX_SIDE = int(os.getenv("IMAGE_OUTPUT_MAX_SIDE", "1080"))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg")
+IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "85"))
+
+# --- Person ROI (two-stage pose detection) ---
+# Uploads whose longest side is at least POSE_ROI_MIN_IMAGE_SIDE get a cheap probe
+# pass at POSE_ROI_PROBE_SIDE to locate the athlete. If they appear smaller than
+# POSE_ROI_MIN_PERSON_SIDE pixels in the probe, pose runs again on a crop around
+# them (POSE_ROI_MARGIN of padding) decoded from the original at POSE_ROI_CROP_SIDE.
+POSE_ROI = os.getenv("POSE_ROI", "true").lower() in ("1", "true", "yes")
+POSE_ROI_MIN_IMAGE_SIDE = int(os.getenv("POSE_ROI_MIN_IMAGE_SIDE", "1600"))
+POSE_ROI_PROBE_SIDE = int(os.getenv("POSE_ROI_PROBE_SIDE", "512"))
+POSE_ROI_MIN_PERSON_SIDE = int(os.getenv("POSE_ROI_MIN_PERSON_SIDE", "256"))
+POSE_ROI_CROP_SIDE = int(os.getenv("POSE_ROI_CROP_SIDE", "512"))
+POSE_ROI_MARGIN = float(os.getenv("POSE_ROI_MARGIN", "0.2"))
+
+# --- Annotated image store ---
+# Annotated images are served from GET /images/{id} instead of being inlined as
+# base64 in the JSON response. The store evicts by total size and by age.
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "image-store")
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_STORE_MAX_AGE_SECONDS = float(os.getenv("IMAGE_STORE_MAX_AGE_SECONDS", str(24 * 3600)))
+
+# --- Batch analysis ---
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 2)))
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "50"))
+
+# --- Upload limits ---
+# Request bodies over these sizes are rejected with 413 before (or while) they are read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(MAX_UPLOAD_BYTES * BATCH_MAX_IMAGES)))
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_BYTES", str(500 * 1024 * 1024)))
+
+# --- Attempt history ---
+# SQLite file for per-user attempt history and its daily/weekly rollups (default: backend/data/history.db,
+# created on startup); empty disables it.
+# Attempts are queued and written in batches of up to HISTORY_BATCH_SIZE at least every
+# HISTORY_FLUSH_INTERVAL_SECONDS; past HISTORY_QUEUE_MAX pending attempts new ones are dropped.
+HISTORY_DB = os.getenv("HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history.db"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "256"))
+HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "1"))
+HISTORY_QUEUE_MAX = int(os.getenv("HISTORY_QUEUE_MAX", "10000"))
+
+# --- Logging ---
+# Per-request detail (headers, landmark coordinates) is only logged at DEBUG.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "json" for one structured object per line, "text" for human-readable lines
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# --- Landmarks ---
+# Landmarks whose MediaPipe visibility is below this are treated as not detected.
+# 0 keeps every landmark the model returns.
+LANDMARK_MIN_VISIBILITY = float(os.getenv("LANDMARK_MIN_VISIBILITY", "0"))
+
+# --- Skill rules ---
+SKILL_RULES_PATH = os.getenv("SKILL_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_rules.json"))
+# How often (at most) the rules file is checked for changes
+SKILL_RULES_RELOAD_INTERVAL_SECONDS = float(os.getenv("SKILL_RULES_RELOAD_INTERVAL_SECONDS", "2"))
+# Minimum match score (0-100) the best-ranked skill needs to be auto-detected when no skill_id is given
+SKILL_DETECT_MIN_MATCH_SCORE = float(os.getenv("SKILL_DETECT_MIN_MATCH_SCORE", "50"))
+
+# --- LLM coaching ---
+# Create a Gemini context cache per skill prompt; falls back to sending the prompt inline when the model rejects it
+LLM_CONTEXT_CACHE = os.getenv("LLM_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+LLM_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Latency budget for the coaching stage (first token when streaming); past it the template coach answers
+COACHING_BUDGET_SECONDS = float(os.getenv("COACHING_BUDGET_SECONDS", "8"))
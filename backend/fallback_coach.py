@@ -0,0 +1,122 @@
+from coaching_prompts import FAMILY_NOTES, skill_family
+
+# Deterministic coaching text used when Gemini is slow or unavailable. It is
+# built only from the structured per-angle results, so it costs microseconds and
+# always matches the numbers in the short summary.
+
+DISCLAIMER = (
+    "⚠️ Disclaimer: I am AI and not a professional coach. Always listen to your body and stop if you feel pain. "
+    "Consult a qualified professional for medical advice or if you are new to these exercises. "
+    "Start with proper progressions and never sacrifice form for advancement speed."
+)
+
+# Cues per joint, matched against the rule name: (angle too small, angle too large)
+JOINT_CUES = (
+    ("elbow", (
+        "Straighten your arms and actively lock the elbows; bent arms shift the load away from the shoulders.",
+        "Your arms are opening past the target; keep a slight, controlled bend and stay out of hyperextension.",
+    )),
+    ("shoulder", (
+        "Open the angle at your shoulder by moving your shoulders further away from your hips.",
+        "Close the angle at your shoulder by bringing your shoulders closer over your hands or bar.",
+    )),
+    ("hip", (
+        "Open your hips: extend them further and squeeze your glutes.",
+        "Pull your hips into a deeper pike or tuck; draw the knees towards the chest.",
+    )),
+    ("knee", (
+        "Extend your knees further and point your toes.",
+        "Tuck your knees in tighter towards your body.",
+    )),
+    ("leg", (
+        "Lift and straighten your legs further, keeping them tight together.",
+        "Bring your legs back in; they are drifting past the target position.",
+    )),
+    ("body", (
+        "Lengthen your body line from shoulders to feet; avoid sagging or piking.",
+        "Bring your body back towards the target line; you are overextending.",
+    )),
+    ("forearm", (
+        "Let your forearms tilt slightly more.",
+        "Keep your forearms closer to vertical against the ground.",
+    )),
+)
+
+GENERIC_CUES = (
+    "Open this joint further towards the target range.",
+    "Close this joint further towards the target range.",
+)
+
+def joint_cue(angle_name, too_small):
+    """Pick the cue for an out-of-range angle from its rule name."""
+    lowered = angle_name.lower()
+    for keyword, cues in JOINT_CUES:
+        if keyword in lowered:
+            return cues[0] if too_small else cues[1]
+    return GENERIC_CUES[0] if too_small else GENERIC_CUES[1]
+
+def template_coaching(selected_skill, angles, score_data):
+    """
+    Build the in-depth coaching section without an LLM.
+
+    Args:
+        selected_skill (str): Name of the skill being analyzed
+        angles (list): Structured per-angle results (AngleResult.to_dict())
+        score_data (dict): Score payload from build_score_data
+
+    Returns:
+        str: Markdown coaching text with the same sections the LLM is asked to produce
+    """
+    skill_title = selected_skill.replace("_", " ").title()
+    overall_score = score_data["overall_score"]
+
+    if score_data["is_passing"]:
+        assessment = f"Strong {skill_title}! Your overall form score is {overall_score}/100, which meets the passing standard."
+    elif overall_score >= 40:
+        assessment = f"Good work on the {skill_title}. At {overall_score}/100 you are getting close; a few adjustments will clean up the position."
+    else:
+        assessment = f"The {skill_title} is a demanding skill. Your form score is {overall_score}/100, so focus on the fundamentals below before adding hold time."
+
+    strengths, improvements, unmeasured = [], [], []
+    for angle in angles:
+        min_angle, max_angle = angle["target_range"]
+        if angle["status"] == "in_range":
+            strengths.append(f"- **{angle['name']}** ({angle['calculated_angle']}°) is within the ideal {min_angle}-{max_angle}°.")
+        elif angle["status"] == "out_of_range":
+            value = angle["calculated_angle"]
+            too_small = value < min_angle
+            off_by = (min_angle - value) if too_small else (value - max_angle)
+            improvements.append((off_by, angle["name"], (
+                f"- **{angle['name']}** is {value}°, about {off_by:.0f}° {'below' if too_small else 'above'} "
+                f"the ideal {min_angle}-{max_angle}°. {joint_cue(angle['name'], too_small)}"
+            )))
+        else:
+            unmeasured.append(f"- **{angle['name']}** could not be measured; make sure your whole body is visible from the side.")
+
+    # Largest deviations first, since they cost the most score
+    improvements.sort(key=lambda item: item[0], reverse=True)
+
+    sections = ["**Overall Assessment**", assessment]
+
+    sections += ["", "**What You're Doing Well**"]
+    sections += strengths or ["- Every measured angle still has room to improve; that is normal at this stage."]
+
+    sections += ["", "**Areas for Improvement**"]
+    sections += [line for _, _, line in improvements] + unmeasured or ["- All measured angles are in range. Focus on holding the position longer with the same form."]
+
+    family = skill_family(selected_skill)
+    if family is not None:
+        sections += ["", "**Key Position Note**", FAMILY_NOTES[family]]
+
+    sections += ["", "**Next Steps**"]
+    if improvements:
+        sections.append(f"- Start with your {improvements[0][1].lower()}: film a few short holds and compare against the target range.")
+        if len(improvements) > 1:
+            sections.append(f"- Once that is consistent, work on your {improvements[1][1].lower()}.")
+        sections.append("- If the corrections feel out of reach, train the previous progression until these angles are consistent.")
+    else:
+        sections.append("- Build hold time in sets of 3-5 clean holds, resting fully between sets.")
+    sections.append("- Warm up wrists, shoulders and elbows before every session.")
+
+    sections += ["", DISCLAIMER]
+    return "\n".join(sections)
@@ -0,0 +1,394 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import config
+from calculate_skill_score import PASSING_SCORE
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("day", "week")
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS attempts (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        skill TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        source TEXT NOT NULL,
+        overall_score REAL NOT NULL,
+        is_passing INTEGER NOT NULL,
+        hold_seconds REAL,
+        angle_scores TEXT NOT NULL,
+        rules_version INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS attempts_user_skill_time ON attempts (user_id, skill, created_at)",
+    # One row per user, skill and day/week, updated as attempts are written, so
+    # trend and best queries read a few hundred rows however long the history is
+    """
+    CREATE TABLE IF NOT EXISTS rollups (
+        user_id TEXT NOT NULL,
+        skill TEXT NOT NULL,
+        period TEXT NOT NULL,
+        period_start TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        score_sum REAL NOT NULL,
+        best_score REAL NOT NULL,
+        passing INTEGER NOT NULL,
+        best_hold_seconds REAL,
+        PRIMARY KEY (user_id, skill, period, period_start)
+    ) WITHOUT ROWID
+    """,
+)
+
+INSERT_ATTEMPT = """
+    INSERT INTO attempts (user_id, skill, created_at, source, overall_score, is_passing, hold_seconds, angle_scores, rules_version)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# MAX() with a NULL argument is NULL in SQLite, hence the COALESCE for hold times
+UPSERT_ROLLUP = """
+    INSERT INTO rollups (user_id, skill, period, period_start, attempts, score_sum, best_score, passing, best_hold_seconds)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, skill, period, period_start) DO UPDATE SET
+        attempts = attempts + excluded.attempts,
+        score_sum = score_sum + excluded.score_sum,
+        best_score = MAX(best_score, excluded.best_score),
+        passing = passing + excluded.passing,
+        best_hold_seconds = COALESCE(MAX(best_hold_seconds, excluded.best_hold_seconds), best_hold_seconds, excluded.best_hold_seconds)
+"""
+
+def period_start(timestamp, period):
+    """UTC start date (ISO string) of the day or ISO week (Monday) containing a Unix timestamp."""
+    day = datetime.fromtimestamp(timestamp, timezone.utc).date()
+    if period == "week":
+        day -= timedelta(days=day.weekday())
+    return day.isoformat()
+
+def _max_or_none(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+class HistoryStore:
+    """
+    Per-user attempt history in SQLite, written in batches off the request path.
+
+    `record` only enqueues; a writer thread commits whatever has queued up (at
+    most `batch_size` attempts, at least every `flush_interval` seconds) in one
+    transaction, updating the daily and weekly rollups in the same transaction
+    so they never disagree with the raw rows. The database runs in WAL mode,
+    so reads (one connection per thread) never wait for the writer. When the
+    queue is full, attempts are dropped and counted rather than slowing
+    requests down.
+    """
+
+    def __init__(self, db_path, batch_size, flush_interval, max_queue):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written_total = 0
+        self.dropped_total = 0
+        self.failed_total = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._opened = False
+        self._open_lock = threading.Lock()
+        # Per-thread state inherited across fork; kept referenced so its connections are never closed in the child
+        self._inherited = []
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def open(self):
+        """
+        Create the database file, its directory and the schema if they do not exist yet.
+
+        Called from the API lifespan rather than at import, so importing the module
+        never touches the disk; `record` and the queries also call it on first use.
+        """
+        if self._opened or not self.enabled:
+            return
+        with self._open_lock:
+            if self._opened:
+                return
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            connection = self._connect()
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            connection.close()
+            self._opened = True
+
+    def _reset_after_fork(self):
+        # The parent's writer thread and connections are not ours: start clean, the parent writes its own queue
+        self._inherited.append(self._local)
+        self._local = threading.local()
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=5.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL stays consistent with NORMAL; only the last commits can be lost on power failure
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.open()
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def record(self, user_id, skill, source, overall_score, is_passing, angle_scores, rules_version=None, hold_seconds=None):
+        """
+        Queue one attempt for writing. Never blocks.
+
+        Args:
+            user_id (str): Who made the attempt
+            skill (str): Skill id
+            source (str): "photo", "video" or "live"
+            overall_score (float): Overall form score (0-100)
+            is_passing (bool): Whether the score meets the passing threshold
+            angle_scores (dict): Angle name -> score
+            rules_version (int): Skill rules version the attempt was scored with
+            hold_seconds (float): Longest hold with every angle in range (video and live only)
+
+        Returns:
+            bool: False if the attempt was dropped because the write queue is full
+        """
+        if not self.enabled:
+            return False
+        self.open()
+        self._ensure_writer()
+
+        attempt = (
+            user_id, skill, time.time(), source, float(overall_score), int(bool(is_passing)),
+            hold_seconds, json.dumps(angle_scores, separators=(",", ":")), rules_version,
+        )
+        try:
+            self._queue.put_nowait(attempt)
+        except queue.Full:
+            self.dropped_total += 1
+            return False
+        return True
+
+    def record_analysis(self, user_id, prepared, source="photo"):
+        """Queue a photo analysis from `analyze.prepare_analysis`; unsupported skills are skipped."""
+        if prepared["summary"] is None:
+            return False
+        score_data = prepared["score_data"]
+        return self.record(
+            user_id,
+            prepared["skill"],
+            source,
+            score_data["overall_score"],
+            score_data["is_passing"],
+            {name: entry["score"] for name, entry in score_data["angle_scores"].items()},
+            prepared["rules_version"],
+        )
+
+    def record_video(self, user_id, video_result):
+        """Queue a video analysis from `video_analyzer.analyze_video`, with per-angle scores averaged over detected frames."""
+        detected = [frame for frame in video_result["timeline"] if frame["detected"]]
+        angle_scores = {
+            name: round(sum(frame["scores"][name] for frame in detected) / len(detected), 1)
+            for name in detected[0]["scores"]
+        }
+        return self.record(
+            user_id,
+            video_result["skill"],
+            "video",
+            video_result["average_score"],
+            video_result["average_score"] >= PASSING_SCORE,
+            angle_scores,
+            video_result["rules_version"],
+            video_result["longest_hold"]["seconds"],
+        )
+
+    def record_live(self, user_id, session):
+        """Queue a finished `LiveSession` as one attempt; sessions that never saw a pose are skipped."""
+        summary = session.summary()
+        if summary is None:
+            return False
+        return self.record(
+            user_id,
+            session.skill,
+            "live",
+            summary["average_score"],
+            summary["average_score"] >= PASSING_SCORE,
+            summary["angle_scores"],
+            session.rules_version,
+            summary["best_hold_seconds"],
+        )
+
+    def _ensure_writer(self):
+        # Started on first use rather than at import, so a pre-forking server starts it in each worker
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        connection = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(connection, batch)
+                self.written_total += len(batch)
+            except sqlite3.Error:
+                self.failed_total += len(batch)
+                logger.exception("Could not write attempt history", extra={"attempts": len(batch)})
+        connection.close()
+
+    def _write(self, connection, batch):
+        # Fold the batch into one rollup row per user/skill/period first
+        rollups = {}
+        for user_id, skill, created_at, _, score, is_passing, hold_seconds, _, _ in batch:
+            for period in PERIODS:
+                key = (user_id, skill, period, period_start(created_at, period))
+                row = rollups.get(key)
+                if row is None:
+                    rollups[key] = [1, score, score, is_passing, hold_seconds]
+                else:
+                    row[0] += 1
+                    row[1] += score
+                    row[2] = max(row[2], score)
+                    row[3] += is_passing
+                    row[4] = _max_or_none(row[4], hold_seconds)
+
+        with connection:
+            connection.executemany(INSERT_ATTEMPT, batch)
+            connection.executemany(UPSERT_ROLLUP, [key + tuple(row) for key, row in rollups.items()])
+
+    def recent(self, user_id, skill, limit=20):
+        """The most recent attempts for a user and skill, newest first."""
+        rows = self._reader().execute(
+            "SELECT created_at, source, overall_score, is_passing, hold_seconds, angle_scores, rules_version FROM attempts "
+            "WHERE user_id = ? AND skill = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, skill, limit),
+        ).fetchall()
+        return [
+            {
+                "created_at": created_at,
+                "source": source,
+                "overall_score": overall_score,
+                "is_passing": bool(is_passing),
+                "hold_seconds": hold_seconds,
+                "angle_scores": json.loads(angle_scores),
+                "rules_version": rules_version,
+            }
+            for created_at, source, overall_score, is_passing, hold_seconds, angle_scores, rules_version in rows
+        ]
+
+    def trend(self, user_id, skill, period="day", limit=90):
+        """
+        Per-day or per-week aggregates for a user and skill, oldest first.
+
+        Raises:
+            ValueError: On an unknown period
+        """
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of: {', '.join(PERIODS)}.")
+        rows = self._reader().execute(
+            "SELECT period_start, attempts, score_sum, best_score, passing, best_hold_seconds FROM rollups "
+            "WHERE user_id = ? AND skill = ? AND period = ? ORDER BY period_start DESC LIMIT ?",
+            (user_id, skill, period, limit),
+        ).fetchall()
+        return [
+            {
+                "period_start": start,
+                "attempts": attempts,
+                "average_score": round(score_sum / attempts, 1),
+                "best_score": best_score,
+                "passing_attempts": passing,
+                "best_hold_seconds": best_hold_seconds,
+            }
+            for start, attempts, score_sum, best_score, passing, best_hold_seconds in reversed(rows)
+        ]
+
+    def best(self, user_id, skill):
+        """All-time bests for a user and skill, read from the weekly rollups."""
+        connection = self._reader()
+        where = "WHERE user_id = ? AND skill = ? AND period = 'week'"
+        attempts, passing = connection.execute(
+            f"SELECT COALESCE(SUM(attempts), 0), COALESCE(SUM(passing), 0) FROM rollups {where}", (user_id, skill)
+        ).fetchone()
+        best_score = connection.execute(
+            f"SELECT best_score, period_start FROM rollups {where} ORDER BY best_score DESC LIMIT 1", (user_id, skill)
+        ).fetchone()
+        best_hold = connection.execute(
+            f"SELECT best_hold_seconds, period_start FROM rollups {where} AND best_hold_seconds IS NOT NULL "
+            "ORDER BY best_hold_seconds DESC LIMIT 1",
+            (user_id, skill),
+        ).fetchone()
+        return {
+            "attempts": attempts,
+            "passing_attempts": passing,
+            "best_score": best_score[0] if best_score else None,
+            "best_score_week": best_score[1] if best_score else None,
+            "best_hold_seconds": best_hold[0] if best_hold else None,
+            "best_hold_week": best_hold[1] if best_hold else None,
+        }
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "pending": self._queue.qsize(),
+            "written_total": self.written_total,
+            "dropped_total": self.dropped_total,
+            "failed_total": self.failed_total,
+        }
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        with self._writer_lock:
+            if self._writer is not None and self._writer.is_alive():
+                self._queue.put(None)
+                self._writer.join()
+            self._writer = None
+
+history_store = HistoryStore(
+    config.HISTORY_DB,
+    config.HISTORY_BATCH_SIZE,
+    config.HISTORY_FLUSH_INTERVAL_SECONDS,
+    config.HISTORY_QUEUE_MAX,
+)
@@ -0,0 +1,209 @@
+import struct
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+import config
+
+OUTPUT_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, "image/jpeg"),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, "image/webp"),
+}
+
+# imdecode flags that let the decoder skip work (for JPEG, whole DCT scales) by reduction factor
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+class OutputOptions(NamedTuple):
+    """How the annotated image is produced. draw=False means landmarks only: no drawing, no encoding."""
+    max_side: int = config.IMAGE_OUTPUT_MAX_SIDE
+    format: str = config.IMAGE_OUTPUT_FORMAT
+    quality: int = config.IMAGE_OUTPUT_QUALITY
+    draw: bool = True
+
+    def cache_tag(self):
+        if not self.draw:
+            return "landmarks"
+        return f"{self.format}:{self.quality}:{self.max_side}"
+
+    @property
+    def media_type(self):
+        return OUTPUT_FORMATS[self.format][2]
+
+def output_options_from_form(form_data):
+    """
+    Read the optional output fields of an /analyze form.
+
+    Raises:
+        ValueError: On an unknown format or out-of-range quality/size
+    """
+    defaults = OutputOptions()
+    output_format = (form_data.get("output_format") or defaults.format).lower()
+    if output_format == "jpg":
+        output_format = "jpeg"
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output_format '{output_format}', use one of: {', '.join(OUTPUT_FORMATS)}.")
+
+    quality = int(form_data.get("output_quality") or defaults.quality)
+    if not 1 <= quality <= 100:
+        raise ValueError("output_quality must be between 1 and 100.")
+
+    max_side = int(form_data.get("output_max_side") or defaults.max_side)
+    if max_side < 64:
+        raise ValueError("output_max_side must be at least 64.")
+
+    draw = str(form_data.get("landmarks_only") or "").lower() not in ("1", "true", "yes")
+
+    return OutputOptions(max_side, output_format, quality, draw)
+
+def probe_image_size(image_bytes):
+    """
+    Read (width, height) from a JPEG or PNG header without decoding any pixels.
+
+    Returns None for other formats or malformed headers.
+    """
+    data = memoryview(image_bytes)
+
+    if data[:8] == PNG_SIGNATURE and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    # Walk the JPEG segments until the start-of-frame marker that carries the size
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        segment_length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+
+    return None
+
+def reduced_decode(source_side, target_side):
+    """
+    The largest decode reduction that still leaves `target_side` pixels on a `source_side` side.
+
+    Returns:
+        tuple: (reduction factor, imdecode flag); (1, IMREAD_COLOR) when no reduction fits
+    """
+    for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+        if source_side / factor >= target_side:
+            return factor, reduced_flag
+    return 1, cv2.IMREAD_COLOR
+
+def is_png(image_bytes):
+    """PNG decoding ignores the reduced flags: libpng always decodes the full image before OpenCV shrinks it."""
+    return bytes(image_bytes[:8]) == PNG_SIGNATURE
+
+def decode_for_inference(image_bytes, max_side=None):
+    """
+    Decode an upload at the lowest resolution that still gives the model `max_side` pixels.
+
+    Args:
+        image_bytes (bytes): Encoded upload
+        max_side (int): Longest side of the returned image (default: POSE_INPUT_MAX_SIDE)
+
+    Returns:
+        tuple: (BGR image, scale) where multiplying working-image pixel coordinates
+               by `scale` maps them back to the original upload's resolution
+
+    Raises:
+        ValueError: If the bytes cannot be decoded as an image
+    """
+    max_side = max_side or config.POSE_INPUT_MAX_SIDE
+    nparr = np.frombuffer(image_bytes, np.uint8)
+
+    original_size = probe_image_size(image_bytes)
+    flag = cv2.IMREAD_COLOR
+    if original_size:
+        _, flag = reduced_decode(max(original_size), max_side)
+
+    image = cv2.imdecode(nparr, flag)
+    if image is None:
+        raise ValueError("Could not decode image from bytes.")
+
+    decoded_side = max(image.shape[:2])
+    original_side = max(original_size) if original_size else decoded_side
+
+    if decoded_side > max_side:
+        ratio = max_side / decoded_side
+        image = cv2.resize(image, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+
+    return image, original_side / max(image.shape[:2])
+
+def decode_region(image_bytes, box, target_side):
+    """
+    Decode only as much resolution as a region needs and return it cropped and resized.
+
+    Args:
+        image_bytes (bytes): Encoded upload
+        box (tuple): (x0, y0, x1, y1) region, normalized to the image size
+        target_side (int): Longest side of the returned crop (it is upscaled if the source has fewer pixels)
+
+    Returns:
+        tuple: (BGR crop with its aspect ratio preserved, the box snapped to the decoded pixels)
+
+    Raises:
+        ValueError: If the bytes cannot be decoded as an image
+    """
+    x0, y0, x1, y1 = box
+    original_size = probe_image_size(image_bytes)
+    flag = cv2.IMREAD_COLOR
+    if original_size:
+        region_side = max((x1 - x0) * original_size[0], (y1 - y0) * original_size[1])
+        _, flag = reduced_decode(region_side, target_side)
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+    if image is None:
+        raise ValueError("Could not decode image from bytes.")
+
+    return crop_region(image, box, target_side)
+
+def crop_region(image, box, target_side):
+    """
+    Crop a normalized (x0, y0, x1, y1) box out of a decoded image and resize its longest side to target_side.
+
+    Returns:
+        tuple: (crop, the box snapped to whole pixels) so callers can map crop coordinates back exactly
+    """
+    height, width = image.shape[:2]
+    x0, y0, x1, y1 = box
+    left, top = int(x0 * width), int(y0 * height)
+    right = max(int(np.ceil(x1 * width)), left + 1)
+    bottom = max(int(np.ceil(y1 * height)), top + 1)
+    crop = image[top:bottom, left:right]
+
+    ratio = target_side / max(crop.shape[:2])
+    interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+    crop = cv2.resize(crop, None, fx=ratio, fy=ratio, interpolation=interpolation)
+    return crop, (left / width, top / height, right / width, bottom / height)
+
+def encode_output(image, options):
+    """Resize the annotated image to the requested size and encode it in the requested format."""
+    if max(image.shape[:2]) > options.max_side:
+        ratio = options.max_side / max(image.shape[:2])
+        image = cv2.resize(image, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+
+    extension, quality_flag, _ = OUTPUT_FORMATS[options.format]
+    is_success, buffer = cv2.imencode(extension, image, [quality_flag, options.quality])
+    if not is_success:
+        raise ValueError("Could not encode processed image to bytes.")
+    return buffer.tobytes()
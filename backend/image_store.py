@@ -0,0 +1,105 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+import config
+
+EXTENSIONS = {"image/jpeg": ".jpg", "image/webp": ".webp"}
+MEDIA_TYPES = {extension: media_type for media_type, extension in EXTENSIONS.items()}
+
+IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.(jpg|webp)$")
+
+# Age-based eviction scans the whole directory, so run it at most this often
+AGE_SWEEP_INTERVAL_SECONDS = 60
+
+class ImageStore:
+    """
+    Content-addressed blob store for annotated images on local disk.
+
+    Images are named after the SHA-256 of their bytes, so identical results share
+    one file and an id doubles as a strong ETag. The store is trimmed to
+    `max_bytes` (least recently written first) and entries older than
+    `max_age_seconds` are dropped.
+    """
+
+    def __init__(self, directory, max_bytes, max_age_seconds):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._lock = threading.Lock()
+        self._last_age_sweep = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def put(self, image_bytes, media_type):
+        """Store an image and return its id."""
+        image_id = hashlib.sha256(image_bytes).hexdigest() + EXTENSIONS[media_type]
+        path = os.path.join(self.directory, image_id)
+
+        try:
+            # Refresh the timestamp so an image that is still being handed out is not evicted
+            os.utime(path)
+        except FileNotFoundError:
+            # New, or evicted (possibly by another worker process) since it was last handed out
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._total_bytes += len(image_bytes)
+
+        self._evict()
+        return image_id
+
+    def path_for(self, image_id):
+        """Return the file path of a stored image, or None for unknown or malformed ids."""
+        if not IMAGE_ID_PATTERN.match(image_id):
+            return None
+        path = os.path.join(self.directory, image_id)
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def media_type_for(image_id):
+        return MEDIA_TYPES[os.path.splitext(image_id)[1]]
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not IMAGE_ID_PATTERN.match(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        return entries
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            sweep_age = now - self._last_age_sweep >= AGE_SWEEP_INTERVAL_SECONDS
+            if not sweep_age and self._total_bytes <= self.max_bytes:
+                return
+            self._last_age_sweep = now if sweep_age else self._last_age_sweep
+
+            entries = sorted(self._scan())
+            total = sum(size for _, _, size in entries)
+            for mtime, name, size in entries:
+                if total <= self.max_bytes and now - mtime <= self.max_age_seconds:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+            self._total_bytes = total
+
+image_store = ImageStore(
+    config.IMAGE_STORE_DIR,
+    config.IMAGE_STORE_MAX_BYTES,
+    config.IMAGE_STORE_MAX_AGE_SECONDS,
+)
@@ -0,0 +1,147 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+import config
+
+# MediaPipe Pose landmark names, in the order the model outputs them
+# (mirrors mp.solutions.pose.PoseLandmark without importing MediaPipe).
+LANDMARK_NAMES = (
+    "NOSE",
+    "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER",
+    "LEFT_EAR", "RIGHT_EAR",
+    "MOUTH_LEFT", "MOUTH_RIGHT",
+    "LEFT_SHOULDER", "RIGHT_SHOULDER",
+    "LEFT_ELBOW", "RIGHT_ELBOW",
+    "LEFT_WRIST", "RIGHT_WRIST",
+    "LEFT_PINKY", "RIGHT_PINKY",
+    "LEFT_INDEX", "RIGHT_INDEX",
+    "LEFT_THUMB", "RIGHT_THUMB",
+    "LEFT_HIP", "RIGHT_HIP",
+    "LEFT_KNEE", "RIGHT_KNEE",
+    "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+)
+
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+
+# Points that the model does not output but the skill rules reference, each
+# defined as the midpoint of two model landmarks.
+DERIVED_LANDMARKS = {
+    "MID_HIP": ("LEFT_HIP", "RIGHT_HIP"),
+    "MID_SHOULDER": ("LEFT_SHOULDER", "RIGHT_SHOULDER"),
+}
+
+ALL_LANDMARK_NAMES = LANDMARK_NAMES + tuple(DERIVED_LANDMARKS)
+
+LANDMARK_INDEX = {name: idx for idx, name in enumerate(ALL_LANDMARK_NAMES)}
+
+# Model landmarks followed by derived points
+NUM_POINTS = len(ALL_LANDMARK_NAMES)
+
+# (num_derived, 2) indices of the landmarks each derived point is the midpoint of
+_DERIVED_SOURCES = np.array(
+    [[LANDMARK_INDEX[a], LANDMARK_INDEX[b]] for a, b in DERIVED_LANDMARKS.values()],
+    dtype=np.intp,
+).reshape(-1, 2)
+
+def with_derived(points):
+    """
+    Append the derived points to a (..., NUM_LANDMARKS, C) array of model landmarks.
+
+    Midpoints are computed for every column, so for (x, y, z, visibility) data the
+    derived visibility is the mean of its sources; NaN sources give a NaN midpoint.
+    """
+    derived = points[..., _DERIVED_SOURCES, :].mean(axis=-2)
+    return np.concatenate([points, derived], axis=-2)
+
+class Landmarks(Mapping):
+    """
+    One detected pose as a single float32 (NUM_POINTS, 4) array of x, y (pixels), z and visibility.
+
+    Also behaves like the old read-only dict of name -> (x, y), so code written
+    against `landmarks.get("LEFT_ELBOW")` keeps working. Landmarks below the
+    visibility threshold are absent from the mapping view.
+    """
+
+    __slots__ = ("array", "min_visibility")
+
+    def __init__(self, array, min_visibility=None):
+        self.array = array
+        self.min_visibility = config.LANDMARK_MIN_VISIBILITY if min_visibility is None else min_visibility
+
+    @classmethod
+    def from_mediapipe(cls, pose_landmarks, image_width, image_height):
+        """
+        Build from `results.pose_landmarks`, keeping sub-pixel precision, z and visibility.
+
+        MediaPipe's x/y are normalized to the image and z uses roughly the same scale
+        as x, so x and z are scaled by the width and y by the height.
+        """
+        raw = np.array(
+            [(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in pose_landmarks.landmark],
+            dtype=np.float32,
+        )
+        raw[:, :3] *= np.array((image_width, image_height, image_width), dtype=np.float32)
+        return cls(with_derived(raw))
+
+    @classmethod
+    def from_list(cls, rows):
+        """Inverse of `to_list`, used by the on-disk pose cache."""
+        return cls(np.array(rows, dtype=np.float32).reshape(NUM_POINTS, 4))
+
+    def to_list(self):
+        return self.array.tolist()
+
+    def visible(self):
+        """(NUM_POINTS,) mask of landmarks at or above the visibility threshold."""
+        return ~np.isnan(self.array[:, 0]) & (self.array[:, 3] >= self.min_visibility)
+
+    def points(self):
+        """(NUM_POINTS, 2) float64 pixel coordinates, NaN where a landmark is not visible."""
+        points = self.array[:, :2].astype(np.float64)
+        points[~self.visible()] = np.nan
+        return points
+
+    def __getitem__(self, name):
+        idx = LANDMARK_INDEX[name]
+        if not self.visible()[idx]:
+            raise KeyError(name)
+        x, y = self.array[idx, :2]
+        return float(x), float(y)
+
+    def __iter__(self):
+        visible = self.visible()
+        return (name for name, is_visible in zip(ALL_LANDMARK_NAMES, visible) if is_visible)
+
+    def __len__(self):
+        return int(self.visible().sum())
+
+    def __repr__(self):
+        return f"Landmarks({dict(self)!r})"
+
+def landmarks_to_array(landmarks):
+    """
+    Pack landmarks into a (NUM_POINTS, 2) float array for the rule engine.
+
+    Accepts a `Landmarks` object or a plain dict of name -> (x, y). For dicts,
+    missing names are NaN and derived points are filled in from their sources
+    unless the dict provides them.
+    """
+    if isinstance(landmarks, Landmarks):
+        return landmarks.points()
+
+    points = np.full((NUM_LANDMARKS, 2), np.nan)
+    for name, point in landmarks.items():
+        idx = LANDMARK_INDEX.get(name)
+        if idx is not None and idx < NUM_LANDMARKS and point:
+            points[idx] = point[:2]
+    points = with_derived(points)
+
+    for name in DERIVED_LANDMARKS:
+        point = landmarks.get(name)
+        if point:
+            points[LANDMARK_INDEX[name]] = point[:2]
+    return points
@@ -0,0 +1,152 @@
+from collections import deque
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import config
+from image_preprocess import decode_for_inference
+from landmarks import Landmarks
+from metrics import timed
+from rule_engine import evaluate
+from rule_registry import rule_registry
+
+class LiveSession:
+    """
+    Scoring state for one live webcam connection.
+
+    Owns a tracking-mode Pose instance (static_image_mode=False): after the first
+    detection MediaPipe follows the person from frame to frame instead of
+    re-detecting, which is both faster and steadier than the per-photo detectors
+    in the pose pool. Like any Pose instance it is not thread-safe, so all calls
+    for one session must come from the same thread.
+
+    The skill's compiled rules are pinned when the session starts, so a rules
+    reload never changes the scoring in the middle of a set.
+    """
+
+    def __init__(self, selected_skill):
+        snapshot = rule_registry.snapshot
+        if selected_skill not in snapshot.raw:
+            raise ValueError(f"Analysis for the skill '{selected_skill}' is not implemented yet.")
+
+        self.skill = selected_skill
+        self.rules_version = snapshot.version
+        self.compiled = snapshot.compiled[selected_skill]
+        self.pose = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=config.POSE_MODEL_COMPLEXITY,
+            min_detection_confidence=config.POSE_MIN_DETECTION_CONFIDENCE,
+            min_tracking_confidence=config.VIDEO_MIN_TRACKING_CONFIDENCE,
+        )
+
+        self.frames_processed = 0
+        self.frames_with_pose = 0
+        self.best_hold_seconds = 0.0
+        self._hold_start = None
+        # Running totals over every frame with a pose, for the end-of-session summary
+        self._score_sum = 0.0
+        self._angle_score_sums = np.zeros(len(self.compiled.angle_names))
+        # (angles, overall score, all in range) for the most recent frames with a pose
+        self._window = deque(maxlen=config.LIVE_STABILITY_WINDOW)
+
+    def process_frame(self, frame_bytes, timestamp):
+        """
+        Run one webcam frame through pose tracking and the rule engine.
+
+        Args:
+            frame_bytes (bytes): Encoded frame (JPEG, WebP, ...)
+            timestamp (float): When the frame arrived, in seconds on a monotonic clock
+
+        Returns:
+            dict: Landmarks, per-angle values and scores, and the rolling hold/stability metrics
+
+        Raises:
+            ValueError: If the frame cannot be decoded
+        """
+        with timed("live_decode"):
+            image, scale = decode_for_inference(frame_bytes, config.LIVE_INPUT_MAX_SIDE)
+            # The decoded frame is ours alone, so convert it in place instead of copying
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+        with timed("live_inference"):
+            results = self.pose.process(image_rgb)
+        self.frames_processed += 1
+
+        if not results.pose_landmarks:
+            # Losing the person ends the hold, like a frame out of range would
+            self._hold_start = None
+            return {"detected": False, **self._rolling_metrics(timestamp)}
+
+        self.frames_with_pose += 1
+        image_height, image_width, _ = image.shape
+        landmarks = Landmarks.from_mediapipe(results.pose_landmarks, image_width * scale, image_height * scale)
+
+        with timed("live_scoring"):
+            result = evaluate(self.compiled, landmarks.points()[np.newaxis])
+        angles = result["angles"][0]
+        scores = result["scores"][0]
+        in_range = bool(result["in_range"][0].all())
+        overall = float(result["overall"][0])
+        self._window.append((angles, overall, in_range))
+        self._score_sum += overall
+        self._angle_score_sums += scores
+
+        if in_range:
+            if self._hold_start is None:
+                self._hold_start = timestamp
+        else:
+            self._hold_start = None
+
+        return {
+            "detected": True,
+            # x, y in frame pixels and visibility, in ALL_LANDMARK_NAMES order
+            "landmarks": np.round(landmarks.array[:, [0, 1, 3]], 2).tolist(),
+            "angles": [None if np.isnan(value) else round(float(value), 1) for value in angles],
+            "scores": [round(float(value), 1) for value in scores],
+            "overall_score": round(overall, 1),
+            "in_range": in_range,
+            **self._rolling_metrics(timestamp),
+        }
+
+    def _rolling_metrics(self, timestamp):
+        hold_seconds = 0.0 if self._hold_start is None else timestamp - self._hold_start
+        self.best_hold_seconds = max(self.best_hold_seconds, hold_seconds)
+
+        stability = None
+        if self._window:
+            # Mean per-angle standard deviation over the window: how much the position wobbles
+            window_angles = np.stack([angles for angles, _, _ in self._window])
+            valid = ~np.isnan(window_angles)
+            counts = valid.sum(axis=0)
+            means = np.where(valid, window_angles, 0.0).sum(axis=0) / np.maximum(counts, 1)
+            variances = (np.where(valid, window_angles - means, 0.0) ** 2).sum(axis=0) / np.maximum(counts, 1)
+            measured = counts > 1
+            jitter = float(np.sqrt(variances[measured]).mean()) if measured.any() else None
+            stability = {
+                "frames": len(self._window),
+                "angle_jitter_degrees": None if jitter is None else round(jitter, 2),
+                "average_score": round(sum(score for _, score, _ in self._window) / len(self._window), 1),
+                "in_range_ratio": round(sum(1 for _, _, ok in self._window if ok) / len(self._window), 3),
+            }
+
+        return {
+            "hold": {"current_seconds": round(hold_seconds, 2), "best_seconds": round(self.best_hold_seconds, 2)},
+            "stability": stability,
+        }
+
+    def summary(self):
+        """Whole-session averages and best hold, or None if no frame had a pose."""
+        if not self.frames_with_pose:
+            return None
+        return {
+            "average_score": round(self._score_sum / self.frames_with_pose, 1),
+            "angle_scores": {
+                name: round(float(total) / self.frames_with_pose, 1)
+                for name, total in zip(self.compiled.angle_names, self._angle_score_sums)
+            },
+            "best_hold_seconds": round(self.best_hold_seconds, 2),
+        }
+
+    def close(self):
+        self.pose.close()
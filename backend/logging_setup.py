@@ -0,0 +1,88 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+import config
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra={...}` fields passed to the logger."""
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED:
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread.
+
+    The stock `prepare` formats the record on the calling thread and folds the
+    traceback into `msg`; here the record is only copied, keeping `args` and
+    `exc_info` so the listener's formatter (e.g. `JsonFormatter`'s
+    "exception" field) sees the original record. Only valid because the
+    listener runs in the same process.
+    """
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+_listener = None
+
+def configure_logging():
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Request handlers only pay for putting a record on the queue; formatting and
+    the actual stdout write happen off the hot path.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if config.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [LocalQueueHandler(log_queue)]
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def _restart_listener_after_fork():
+    # The listener thread does not survive fork; give the child its own queue and thread
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,104 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, spanning sub-millisecond scoring to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+STAGE_SECONDS = Histogram("now_stage_duration_seconds", "Time spent in each pipeline stage.")
+STAGE_ERRORS = Counter("now_stage_errors_total", "Pipeline stage invocations that raised.")
+REQUEST_SECONDS = Histogram("now_http_request_duration_seconds", "HTTP request latency by route and status.")
+COACHING_SOURCE = Counter("now_coaching_source_total", "Coaching texts by the path that produced them (llm, cache, fallback, none).")
+LIVE_FRAMES = Counter("now_live_frames_total", "Live webcam frames by outcome (processed, dropped).")
+LLM_TOKENS = Counter("now_llm_tokens_total", "Gemini tokens per coaching call by kind (input, cached, output) and skill.")
+
+_gauge_collectors = []
+
+def register_gauges(collector):
+    """
+    Register a callable returning {metric_name: (metric_type, help_text, value)} that is sampled on every scrape.
+
+    Used for values that already live elsewhere (queue depth, cache sizes) so they
+    do not have to be mirrored into counters on the hot path.
+    """
+    _gauge_collectors.append(collector)
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the `with` block under now_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+def render_metrics():
+    """Everything in the Prometheus text exposition format."""
+    lines = []
+    for metric in (STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS, COACHING_SOURCE, LIVE_FRAMES, LLM_TOKENS):
+        lines += metric.render()
+    for collector in _gauge_collectors:
+        for name, (metric_type, help_text, value) in collector().items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
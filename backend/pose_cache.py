@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import config
+from landmarks import Landmarks
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry overhead of the landmark dict, counted against the byte budget
+LANDMARKS_SIZE_ESTIMATE = 4096
+
+# Disk eviction trims to this fraction of the budget, so the directory scan it
+# needs runs once per ~10% of the budget written rather than on every write
+DISK_EVICT_TARGET = 0.9
+
+def content_key(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def _write_atomic(path, data):
+    """Write through a temp file unique to this process and thread, so concurrent writers of one key never share it."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class PoseCache:
+    """
+    Content-addressed cache of pose detection results (annotated image + landmarks).
+
+    The memory tier is an LRU bounded by total bytes. The optional disk tier keeps
+    one image file and one landmarks file per entry and evicts the least recently
+    used entries once it grows past its byte budget. Its size is tracked in memory,
+    so the directory is only scanned at startup and when eviction is due.
+    """
+
+    def __init__(self, max_bytes, cache_dir=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._scan_disk())
+
+    def lookup(self, image_bytes, variant=""):
+        """
+        Hash the upload and look it up.
+
+        Args:
+            image_bytes (bytes): The raw upload
+            variant (str): Distinguishes results of the same upload produced with different output options
+
+        Returns:
+            tuple: (key, (processed_image_bytes, landmarks) or None)
+        """
+        key = content_key(image_bytes)
+        if variant:
+            key = hashlib.sha256(f"{key}:{variant}".encode("utf-8")).hexdigest()
+        return key, self.get(key)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, entry)
+        return entry
+
+    def set(self, key, processed_image_bytes, landmarks):
+        entry = (processed_image_bytes, landmarks)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def _store(self, key, entry):
+        if key in self._entries:
+            self._bytes -= self._entry_size(self._entries.pop(key))
+        self._entries[key] = entry
+        self._bytes += self._entry_size(entry)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(evicted)
+
+    @staticmethod
+    def _entry_size(entry):
+        return len(entry[0] or b"") + LANDMARKS_SIZE_ESTIMATE
+
+    def _disk_paths(self, key):
+        return os.path.join(self.cache_dir, key + ".img"), os.path.join(self.cache_dir, key + ".json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+
+        image_path, landmarks_path = self._disk_paths(key)
+        try:
+            with open(landmarks_path, "r") as f:
+                landmarks = Landmarks.from_list(json.load(f))
+            with open(image_path, "rb") as f:
+                # Landmarks-only entries are stored with an empty image file
+                processed_image_bytes = f.read() or None
+            # Bump the access time used for LRU eviction
+            os.utime(landmarks_path)
+        except (OSError, ValueError):
+            return None
+
+        return processed_image_bytes, landmarks
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+
+        image_path, landmarks_path = self._disk_paths(key)
+        # Another request (or worker process) may have written the same key already
+        previous_size = self._disk_entry_size(key) or 0
+        try:
+            # Write the image first: an entry only counts once its landmarks file exists
+            _write_atomic(image_path, entry[0] or b"")
+            landmarks_json = json.dumps(entry[1].to_list())
+            _write_atomic(landmarks_path, landmarks_json.encode())
+        except OSError as e:
+            logger.warning("Could not write pose cache entry to disk", extra={"error": str(e)})
+            return
+
+        with self._disk_lock:
+            self._disk_bytes += len(entry[0] or b"") + len(landmarks_json) - previous_size
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_entry_size(self, key):
+        """Bytes of one entry's image and landmarks files, or None if it is not (fully) on disk."""
+        image_path, landmarks_path = self._disk_paths(key)
+        try:
+            return os.path.getsize(image_path) + os.path.getsize(landmarks_path)
+        except OSError:
+            return None
+
+    def _scan_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            image_path, landmarks_path = self._disk_paths(key)
+            try:
+                landmarks_stat = os.stat(landmarks_path)
+                size = os.path.getsize(image_path) + landmarks_stat.st_size
+            except OSError:
+                continue
+            entries.append((landmarks_stat.st_mtime, key, size))
+        return entries
+
+    def _evict_disk(self):
+        # One thread rescans and trims; others keep writing and re-check on their next write
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = sorted(self._scan_disk())
+            total = sum(size for _, _, size in entries)
+            target = self.disk_max_bytes * DISK_EVICT_TARGET
+            for _, key, size in entries:
+                if total <= target:
+                    break
+                for path in self._disk_paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+            # The scan also picks up whatever other worker processes wrote
+            with self._disk_lock:
+                self._disk_bytes = total
+        finally:
+            self._evict_lock.release()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": bool(self.cache_dir),
+            "disk_bytes": self._disk_bytes,
+        }
+
+pose_cache = PoseCache(
+    config.POSE_CACHE_MAX_BYTES,
+    config.POSE_CACHE_DIR or None,
+    config.POSE_CACHE_DISK_MAX_BYTES,
+)
@@ -1,74 +1,188 @@
-import os
+import logging
 import cv2
 import mediapipe as mp
 import numpy as np
 
-def perform_pose_detection(image_bytes):
-    # Initialize MediaPipe's Pose solution
+import config
+from metrics import timed
+from landmarks import Landmarks
+from image_preprocess import OutputOptions, crop_region, decode_for_inference, decode_region, encode_output, is_png, probe_image_size, reduced_decode
+from pose_pool import get_pose_pool
+
+logger = logging.getLogger(__name__)
+
+def run_pose(image):
+    """Run a pooled Pose instance on a BGR image."""
+    # MediaPipe works with RGB images, but OpenCV reads them in BGR format. Swap the
+    # channels in place and back afterwards instead of allocating a full-frame RGB copy.
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    try:
+        # Borrow a pre-warmed detector instead of building a new graph per call
+        with get_pose_pool().checkout() as pose:
+            return pose.process(image)
+    finally:
+        cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
+
+def person_box(pose_landmarks, margin):
+    """Normalized (x0, y0, x1, y1) box around a detected pose, padded by `margin` of its size and clamped to the image."""
+    xs = [landmark.x for landmark in pose_landmarks.landmark]
+    ys = [landmark.y for landmark in pose_landmarks.landmark]
+    pad_x = (max(xs) - min(xs)) * margin
+    pad_y = (max(ys) - min(ys)) * margin
+    return (
+        max(0.0, min(xs) - pad_x),
+        max(0.0, min(ys) - pad_y),
+        min(1.0, max(xs) + pad_x),
+        min(1.0, max(ys) + pad_y),
+    )
+
+def remap_to_frame(pose_landmarks, box):
+    """Rewrite (in place) landmarks detected in a crop of `box` so they are normalized to the full frame."""
+    x0, y0, x1, y1 = box
+    for landmark in pose_landmarks.landmark:
+        landmark.x = x0 + landmark.x * (x1 - x0)
+        landmark.y = y0 + landmark.y * (y1 - y0)
+        # z is on the same scale as x
+        landmark.z *= x1 - x0
+
+def detect_with_roi(image, image_bytes, scale):
+    """
+    Two-stage detection for large uploads where the athlete may fill only part of the frame.
+
+    A probe pass at POSE_ROI_PROBE_SIDE locates the person. If they already span
+    POSE_ROI_MIN_PERSON_SIDE probe pixels, the probe result is used as is;
+    otherwise pose runs again on a crop around them, taken from the original
+    upload at POSE_ROI_CROP_SIDE, so the model sees the athlete at full detail
+    instead of a few downscaled pixels.
+
+    Returns:
+        MediaPipe results whose landmarks are normalized to the full frame
+    """
+    height, width = image.shape[:2]
+    probe_ratio = config.POSE_ROI_PROBE_SIDE / max(height, width)
+    probe = image if probe_ratio >= 1 else cv2.resize(image, None, fx=probe_ratio, fy=probe_ratio, interpolation=cv2.INTER_AREA)
+
+    with timed("roi_probe"):
+        results = run_pose(probe)
+    if not results.pose_landmarks:
+        if probe is image:
+            return results
+        # Nobody found at probe size; give the full working image a chance
+        with timed("inference"):
+            return run_pose(image)
+
+    box = person_box(results.pose_landmarks, config.POSE_ROI_MARGIN)
+    person_side = max((box[2] - box[0]) * probe.shape[1], (box[3] - box[1]) * probe.shape[0])
+    if person_side >= config.POSE_ROI_MIN_PERSON_SIDE:
+        return results
+
+    with timed("roi_crop"):
+        working_side = max((box[2] - box[0]) * width, (box[3] - box[1]) * height)
+        if working_side >= config.POSE_ROI_CROP_SIDE or scale <= 1:
+            # The working image already has enough pixels there (or nothing better exists)
+            crop, box = crop_region(image, box, config.POSE_ROI_CROP_SIDE)
+        else:
+            crop, box = decode_region(image_bytes, box, config.POSE_ROI_CROP_SIDE)
+
+    with timed("inference"):
+        crop_results = run_pose(crop)
+    if not crop_results.pose_landmarks:
+        return results
+
+    remap_to_frame(crop_results.pose_landmarks, box)
+    return crop_results
+
+def uses_person_roi(original_size):
+    """Whether an upload of this (width, height) goes through the two-stage person ROI detection."""
+    return config.POSE_ROI and original_size is not None and max(original_size) >= config.POSE_ROI_MIN_IMAGE_SIDE
+
+def estimate_decode_bytes(image_header):
+    """
+    Peak pixel memory of `perform_pose_detection` for an upload, judged from its first bytes.
+
+    The decode normally stops at a reduced resolution, but PNGs are always
+    decoded in full, and the person ROI path may decode the full frame again
+    to crop the athlete from it, so those count the full-resolution frame too.
+
+    Args:
+        image_header (bytes): The start of the upload (enough to hold its size header)
+
+    Returns:
+        int: Estimated bytes, or None when the size cannot be read from the header
+    """
+    original_size = probe_image_size(image_header)
+    if original_size is None:
+        return None
+
+    width, height = original_size
+    side = config.POSE_INPUT_MAX_SIDE
+    factor, _ = reduced_decode(max(original_size), side)
+    # Reduced decode output plus the working image it is resized to
+    estimate = -(-width // factor) * -(-height // factor) * 3 + side * side * 3
+    if is_png(image_header) or uses_person_roi(original_size):
+        estimate += width * height * 3
+    return estimate
+
+def perform_pose_detection(image_bytes, options=None):
+    """
+    Detect the pose in an uploaded photo.
+
+    Args:
+        image_bytes (bytes): Encoded upload
+        options (OutputOptions): Size/format/quality of the annotated image, or draw=False
+                                 to skip drawing and encoding entirely
+
+    Returns:
+        tuple: (annotated image bytes or None, Landmarks in original-image pixels)
+    """
+    options = options or OutputOptions()
     mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.7)
-    
     mp_drawing = mp.solutions.drawing_utils
 
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    original_size = probe_image_size(image_bytes)
+    use_roi = uses_person_roi(original_size)
 
-    if image is None:
-        print(f"Error: Could not decode image from bytes.")
-        raise ValueError("Could not decode image from bytes.")
+    # Decode at reduced resolution and shrink to what the model actually needs.
+    # Without drawing, the ROI path only ever needs the probe-sized image.
+    with timed("decode"):
+        image, scale = decode_for_inference(image_bytes, config.POSE_ROI_PROBE_SIDE if use_roi and not options.draw else None)
 
-    # MediaPipe works with RGB images, but OpenCV reads them in BGR format.
-    # So, we need to convert the color space.
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-    # Process the image and find the pose
-    print("Detecting pose...")
-    results = pose.process(image_rgb)
+    if use_roi:
+        results = detect_with_roi(image, image_bytes, scale)
+    else:
+        with timed("inference"):
+            results = run_pose(image)
 
-    # --- Print and Draw Keypoints ---
+    # --- Log and Draw Keypoints ---
     if results.pose_landmarks:
-        print("\n--- Keypoints Detected ---")
-        
-        landmarks = {}
-        
-        # Get the image dimensions to un-normalize the coordinates
+
+        # Un-normalize to the original upload's resolution, not the downscaled working image
         image_height, image_width, _ = image.shape
-        
-        # Iterate over all detected landmarks
-        for idx, landmark in enumerate(results.pose_landmarks.landmark):
-            # Get the name of the landmark using the PoseLandmark enum
-            landmark_name = mp_pose.PoseLandmark(idx).name
-            
-            # The landmark coordinates are normalized (from 0.0 to 1.0)
-            # We convert them to pixel coordinates
-            pixel_x = int(landmark.x * image_width)
-            pixel_y = int(landmark.y * image_height)
-            
-            # Print the keypoint name and its coordinates
-            print(f"-> {landmark_name:<20}: ({pixel_x}, {pixel_y})")
-            
-            landmarks[landmark_name] = (pixel_x, pixel_y)
-
-        print("\nDrawing landmarks on the image...")
-        # Draw the landmarks and connections on the original BGR image
-        annotated_image = image.copy()
-        mp_drawing.draw_landmarks(
-            annotated_image,
-            results.pose_landmarks,
-            mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=2, circle_radius=2),
-            connection_drawing_spec=mp_drawing.DrawingSpec(color=(0,0,255), thickness=2, circle_radius=2)
-        )
-
-        # Convert the annotated image (NumPy array) back to bytes
-        is_success, buffer = cv2.imencode(".jpg", annotated_image)
-        if not is_success:
-            raise ValueError("Could not encode processed image to bytes.")
-        processed_image_bytes = buffer.tobytes()
+        landmarks = Landmarks.from_mediapipe(results.pose_landmarks, image_width * scale, image_height * scale)
+
+        # Per-landmark detail is only worth formatting when someone is debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Keypoints detected", extra={"landmarks": landmarks})
+
+        if not options.draw:
+            return None, landmarks
+
+        with timed("draw_encode"):
+            # The working image is our own downscaled copy, so draw on it in place
+            mp_drawing.draw_landmarks(
+                image,
+                results.pose_landmarks,
+                mp_pose.POSE_CONNECTIONS,
+                landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=2, circle_radius=2),
+                connection_drawing_spec=mp_drawing.DrawingSpec(color=(0,0,255), thickness=2, circle_radius=2)
+            )
+
+            # Convert the annotated image (NumPy array) back to bytes
+            processed_image_bytes = encode_output(image, options)
 
         # Return the processed image bytes and landmarks
-        return processed_image_bytes, landmarks, image_bytes
+        return processed_image_bytes, landmarks
 
     else:
-        print("No human pose detected in the image.")
+        logger.info("No human pose detected in the image.")
         raise ValueError("No human pose detected in the image.")
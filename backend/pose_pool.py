@@ -0,0 +1,170 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import mediapipe as mp
+import numpy as np
+
+import config
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Pose landmark model per model_complexity, relative to the directory containing the mediapipe package
+POSE_LANDMARK_MODELS = (
+    "mediapipe/modules/pose_landmark/pose_landmark_lite.tflite",
+    "mediapipe/modules/pose_landmark/pose_landmark_full.tflite",
+    "mediapipe/modules/pose_landmark/pose_landmark_heavy.tflite",
+)
+POSE_DETECTION_MODEL = "mediapipe/modules/pose_detection/pose_detection.tflite"
+
+# Size of the blank frame used to push each instance through its graph once
+# before it serves a real request.
+WARMUP_FRAME_SHAPE = (256, 256, 3)
+
+
+class PosePoolClosedError(RuntimeError):
+    pass
+
+
+class PosePool:
+    """
+    Fixed-size pool of pre-warmed MediaPipe Pose instances.
+
+    Building a Pose graph loads the model and allocates native resources, so we
+    pay that cost once at startup and hand instances out per request instead.
+    A Pose instance is not thread-safe, which is why each one is checked out
+    exclusively.
+    """
+
+    def __init__(self, size=None, static_image_mode=True, min_detection_confidence=None, model_complexity=None):
+        self.size = size or config.POSE_POOL_SIZE
+        self.static_image_mode = static_image_mode
+        self.min_detection_confidence = (
+            min_detection_confidence if min_detection_confidence is not None else config.POSE_MIN_DETECTION_CONFIDENCE
+        )
+        self.model_complexity = model_complexity if model_complexity is not None else config.POSE_MODEL_COMPLEXITY
+
+        self._available = queue.Queue(maxsize=self.size)
+        self._closed = False
+
+        for _ in range(self.size):
+            self._available.put(self._create_instance())
+
+    def _create_instance(self):
+        pose = mp.solutions.pose.Pose(
+            static_image_mode=self.static_image_mode,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+        )
+        pose.process(np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8))
+        return pose
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Borrow a Pose instance for the duration of the `with` block.
+
+        Args:
+            timeout (float): Seconds to wait for a free instance (default: POSE_POOL_TIMEOUT)
+
+        Raises:
+            TimeoutError: If no instance became free in time
+            PosePoolClosedError: If the pool has been shut down
+        """
+        if self._closed:
+            raise PosePoolClosedError("Pose pool is closed.")
+
+        try:
+            with timed("pose_checkout"):
+                pose = self._available.get(timeout=timeout if timeout is not None else config.POSE_POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError("Timed out waiting for a free pose detector.")
+
+        try:
+            yield pose
+        finally:
+            if self._closed:
+                pose.close()
+            else:
+                self._available.put(pose)
+
+    def close(self):
+        """Release the native resources held by every idle instance."""
+        self._closed = True
+        while True:
+            try:
+                pose = self._available.get_nowait()
+            except queue.Empty:
+                break
+            pose.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+# Pools inherited across fork; kept referenced so their dead graphs are never closed (or collected) in the child
+_inherited_pools = []
+
+
+def _reset_after_fork():
+    # MediaPipe graphs lose their native threads in a fork: the child must build its own pool
+    global _default_pool, _default_pool_lock
+    if _default_pool is not None:
+        _inherited_pools.append(_default_pool)
+    _default_pool = None
+    _default_pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pose_pool():
+    """Return the process-wide pose pool, creating and warming it on first use."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = PosePool()
+    return _default_pool
+
+
+def preload_model_files(model_complexity=None):
+    """
+    Make sure the Pose model files are on disk and in the OS page cache, without building a graph.
+
+    Meant for a pre-forking parent process: MediaPipe graphs own native threads
+    that do not survive fork, so each worker still builds its own pool, but none
+    of them has to download a model or read it from a cold disk.
+
+    Returns:
+        int: Bytes of model data read
+    """
+    complexity = model_complexity if model_complexity is not None else config.POSE_MODEL_COMPLEXITY
+    landmark_model = POSE_LANDMARK_MODELS[complexity]
+    if complexity != 1:
+        # Only the full model ships with the wheel; Pose downloads the others on first use
+        from mediapipe.python.solutions import download_utils
+        download_utils.download_oss_model(landmark_model)
+
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(mp.__file__)))
+    total = 0
+    for relative_path in (POSE_DETECTION_MODEL, landmark_model):
+        path = os.path.join(package_parent, relative_path)
+        if not os.path.exists(path):
+            # Other mediapipe layouts just start colder; the pools still load the models themselves
+            logger.warning("Pose model file not found, skipping preload", extra={"path": path})
+            continue
+        with open(path, "rb") as model_file:
+            while chunk := model_file.read(1024 * 1024):
+                total += len(chunk)
+    return total
+
+
+def close_pose_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+            _default_pool = None
@@ -0,0 +1,190 @@
+import numpy as np
+
+from landmarks import LANDMARK_INDEX, NUM_LANDMARKS, with_derived
+
+# Matches the default of calculate_skill_score.calculate_angle_score
+ANGLE_SCORE_TOLERANCE = 15.0
+
+class CompiledSkill:
+    """
+    One skill's rules flattened into arrays, ready for batched evaluation.
+
+    Attributes:
+        angle_names (list): Rule names in SKILL_RULES order
+        point_names (list): The three landmark names of each rule
+        indices (np.ndarray): (R, 3) landmark indices of each rule's points
+        known (np.ndarray): (R, 3) False where a point is not a landmark we produce
+        mins, maxs (np.ndarray): (R,) target range of each rule in degrees
+    """
+
+    __slots__ = ("name", "angle_names", "point_names", "indices", "known", "mins", "maxs")
+
+    def __init__(self, name, rules):
+        self.name = name
+        angle_rules = rules["angles_to_check"]
+        self.angle_names = [rule["name"] for rule in angle_rules]
+        self.point_names = [list(rule["points"]) for rule in angle_rules]
+
+        # Unknown landmark names get index 0 and are masked out via `known`
+        self.known = np.array([[p in LANDMARK_INDEX for p in points] for points in self.point_names], dtype=bool).reshape(-1, 3)
+        self.indices = np.array([[LANDMARK_INDEX.get(p, 0) for p in points] for points in self.point_names], dtype=np.intp).reshape(-1, 3)
+        self.mins = np.array([rule["min"] for rule in angle_rules], dtype=np.float64)
+        self.maxs = np.array([rule["max"] for rule in angle_rules], dtype=np.float64)
+
+class CompiledCatalogue:
+    """
+    Every skill's rules in one set of arrays, so a pose is scored against the whole catalogue in one pass.
+
+    Angles that several skills check (the same three landmarks) are computed once
+    and fanned out to each skill's rules.
+
+    Attributes:
+        skills (list): Skill names in SKILL_RULES order
+        families (list): Progression family of each skill (None when not given)
+        levels (list): Level of each skill within its family (None when not given)
+        indices (np.ndarray): (U, 3) landmark indices of each distinct angle
+        known (np.ndarray): (U,) False where a distinct angle uses a point we do not produce
+        columns (np.ndarray): (T,) distinct-angle column of every rule, rules grouped by skill
+        starts (np.ndarray): (S,) position of each skill's first rule in `columns`
+        counts (np.ndarray): (S,) number of rules per skill
+        mins, maxs (np.ndarray): (T,) target range of every rule in degrees
+    """
+
+    __slots__ = ("skills", "families", "levels", "indices", "known", "columns", "starts", "counts", "mins", "maxs")
+
+    def __init__(self, skill_rules, compiled):
+        self.skills = list(skill_rules)
+        self.families = [skill_rules[name].get("family") for name in self.skills]
+        self.levels = [skill_rules[name].get("level") for name in self.skills]
+
+        distinct = {}
+        columns = []
+        for name in self.skills:
+            skill = compiled[name]
+            for rule_indices, rule_known in zip(skill.indices, skill.known):
+                key = (tuple(rule_indices), bool(rule_known.all()))
+                columns.append(distinct.setdefault(key, len(distinct)))
+
+        self.indices = np.array([key[0] for key in distinct], dtype=np.intp).reshape(-1, 3)
+        self.known = np.array([key[1] for key in distinct], dtype=bool)
+        self.columns = np.array(columns, dtype=np.intp)
+        self.counts = np.array([len(compiled[name].angle_names) for name in self.skills], dtype=np.intp)
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.intp)
+        self.mins = np.concatenate([compiled[name].mins for name in self.skills])
+        self.maxs = np.concatenate([compiled[name].maxs for name in self.skills])
+
+def compile_rules(skill_rules):
+    """Compile a SKILL_RULES-style dict into {skill: CompiledSkill}."""
+    return {name: CompiledSkill(name, rules) for name, rules in skill_rules.items()}
+
+def compute_angles(points, indices):
+    """
+    Compute every (a, b, c) angle at vertex b for a batch of frames in one pass.
+
+    Args:
+        points (np.ndarray): (N, K, 2) landmark coordinates, NaN where missing
+        indices (np.ndarray): (R, 3) landmark indices per angle
+
+    Returns:
+        np.ndarray: (N, R) angles in degrees, NaN where a point is missing or a vector has zero length
+    """
+    a = points[:, indices[:, 0]]
+    b = points[:, indices[:, 1]]
+    c = points[:, indices[:, 2]]
+    ba = a - b
+    bc = c - b
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosine = np.einsum("nrk,nrk->nr", ba, bc) / (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1))
+        return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+def score_angles(angles, mins, maxs, tolerance=ANGLE_SCORE_TOLERANCE):
+    """
+    Vectorized calculate_angle_score: 100 inside [min, max], exponential decay with the
+    distance to the nearest boundary outside it, and 0 where the angle is NaN.
+    """
+    deviation = np.maximum(mins - angles, 0.0) + np.maximum(angles - maxs, 0.0)
+    scores = 100.0 * np.exp(-deviation / tolerance)
+    return np.nan_to_num(scores, nan=0.0)
+
+def _as_frames(points):
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim == 2:
+        points = points[np.newaxis]
+    if points.shape[1] == NUM_LANDMARKS:
+        points = with_derived(points)
+    return points
+
+def evaluate(compiled, points):
+    """
+    Score a batch of frames against one compiled skill.
+
+    Args:
+        compiled (CompiledSkill): Output of `compile_rules`
+        points (np.ndarray): (N, K, 2) or (K, 2) landmark coordinates; with K == NUM_LANDMARKS
+                             (raw model output) the derived points are appended first
+
+    Returns:
+        dict of arrays: "angles", "scores", "in_range", "valid" (all (N, R)),
+        "point_missing" ((N, R, 3)) and "overall" ((N,), mean score over valid angles)
+    """
+    points = _as_frames(points)
+
+    point_missing = np.isnan(points[:, compiled.indices]).any(axis=-1) | ~compiled.known
+    angles = compute_angles(points, compiled.indices)
+    angles[point_missing.any(axis=-1)] = np.nan
+
+    valid = ~np.isnan(angles)
+    scores = score_angles(angles, compiled.mins, compiled.maxs)
+    with np.errstate(invalid="ignore"):
+        in_range = (angles >= compiled.mins) & (angles <= compiled.maxs)
+
+    valid_count = valid.sum(axis=-1)
+    overall = np.where(valid_count > 0, (scores * valid).sum(axis=-1) / np.maximum(valid_count, 1), 0.0)
+
+    return {
+        "angles": angles,
+        "scores": scores,
+        "in_range": in_range,
+        "valid": valid,
+        "point_missing": point_missing,
+        "overall": overall,
+    }
+
+def evaluate_catalogue(catalogue, points):
+    """
+    Score a batch of frames against every skill at once.
+
+    Args:
+        catalogue (CompiledCatalogue): Output of `CompiledCatalogue(skill_rules, compile_rules(skill_rules))`
+        points (np.ndarray): (N, K, 2) or (K, 2) landmark coordinates, as for `evaluate`
+
+    Returns:
+        dict of (N, S) arrays, one column per skill in `catalogue.skills` order:
+        "overall" (same value `evaluate` gives), "match" (mean score with unmeasured
+        angles counted as 0, comparable across skills), "measured" and "in_range"
+        (fraction of the skill's rules that were measured / in range)
+    """
+    points = _as_frames(points)
+
+    point_missing = np.isnan(points[:, catalogue.indices]).any(axis=(-1, -2)) | ~catalogue.known
+    distinct_angles = compute_angles(points, catalogue.indices)
+    distinct_angles[point_missing] = np.nan
+
+    angles = distinct_angles[:, catalogue.columns]
+    valid = ~np.isnan(angles)
+    scores = score_angles(angles, catalogue.mins, catalogue.maxs)
+    with np.errstate(invalid="ignore"):
+        in_range = (angles >= catalogue.mins) & (angles <= catalogue.maxs)
+
+    # Rules are grouped by skill, so per-skill sums are segment sums
+    score_sums = np.add.reduceat(scores, catalogue.starts, axis=-1)
+    valid_counts = np.add.reduceat(valid, catalogue.starts, axis=-1)
+    in_range_counts = np.add.reduceat(in_range, catalogue.starts, axis=-1)
+
+    return {
+        "overall": np.where(valid_counts > 0, score_sums / np.maximum(valid_counts, 1), 0.0),
+        "match": score_sums / catalogue.counts,
+        "measured": valid_counts / catalogue.counts,
+        "in_range": in_range_counts / catalogue.counts,
+    }
@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+from landmarks import LANDMARK_INDEX
+from rule_engine import CompiledCatalogue, compile_rules
+
+logger = logging.getLogger(__name__)
+
+MAX_JOINT_ANGLE = 180
+
+class RuleValidationError(ValueError):
+    pass
+
+class RuleSnapshot:
+    """
+    One immutable, validated version of the skill rules.
+
+    Attributes:
+        version (int): Version declared in the rules file; downstream caches key on it
+        raw (dict): Skill name -> rules, in the SKILL_RULES dict layout
+        compiled (dict): Skill name -> rule_engine.CompiledSkill
+        catalogue (CompiledCatalogue): All skills compiled together for whole-catalogue ranking
+    """
+
+    __slots__ = ("version", "raw", "compiled", "catalogue")
+
+    def __init__(self, version, raw):
+        self.version = version
+        self.raw = raw
+        self.compiled = compile_rules(raw)
+        self.catalogue = CompiledCatalogue(raw, self.compiled)
+
+def validate_rules(data):
+    """
+    Check a parsed rules file and return (version, skills).
+
+    Raises:
+        RuleValidationError: Describing the first problem found
+    """
+    if not isinstance(data, dict):
+        raise RuleValidationError("Rules file must contain a JSON object.")
+
+    version = data.get("version")
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        raise RuleValidationError("'version' must be a positive integer.")
+
+    skills = data.get("skills")
+    if not isinstance(skills, dict) or not skills:
+        raise RuleValidationError("'skills' must be a non-empty object.")
+
+    family_levels = {}
+    for skill_name, rules in skills.items():
+        angle_rules = rules.get("angles_to_check") if isinstance(rules, dict) else None
+        if not isinstance(angle_rules, list) or not angle_rules:
+            raise RuleValidationError(f"{skill_name}: 'angles_to_check' must be a non-empty list.")
+
+        # Optional progression metadata: skills of one family ordered by level, easiest first
+        family, level = rules.get("family"), rules.get("level")
+        if family is not None or level is not None:
+            if not isinstance(family, str) or not family:
+                raise RuleValidationError(f"{skill_name}: 'family' must be a non-empty string when 'level' is set.")
+            if not isinstance(level, int) or isinstance(level, bool) or level < 1:
+                raise RuleValidationError(f"{skill_name}: 'level' must be a positive integer when 'family' is set.")
+            if (family, level) in family_levels:
+                raise RuleValidationError(f"{skill_name}: {family} level {level} is already used by {family_levels[family, level]}.")
+            family_levels[family, level] = skill_name
+
+        seen_names = set()
+        for angle_rule in angle_rules:
+            angle_name = angle_rule.get("name") if isinstance(angle_rule, dict) else None
+            where = f"{skill_name} / {angle_name}"
+            if not isinstance(angle_name, str) or not angle_name:
+                raise RuleValidationError(f"{skill_name}: every rule needs a non-empty 'name'.")
+            if angle_name in seen_names:
+                raise RuleValidationError(f"{where}: duplicate rule name.")
+            seen_names.add(angle_name)
+
+            points = angle_rule.get("points")
+            if not isinstance(points, list) or len(points) != 3:
+                raise RuleValidationError(f"{where}: 'points' must list exactly three landmarks.")
+            unknown = [point for point in points if point not in LANDMARK_INDEX]
+            if unknown:
+                raise RuleValidationError(f"{where}: unknown landmarks {', '.join(map(str, unknown))}.")
+
+            min_angle, max_angle = angle_rule.get("min"), angle_rule.get("max")
+            if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (min_angle, max_angle)):
+                raise RuleValidationError(f"{where}: 'min' and 'max' must be numbers.")
+            if not 0 <= min_angle <= max_angle <= MAX_JOINT_ANGLE:
+                raise RuleValidationError(
+                    f"{where}: range {min_angle}-{max_angle} must satisfy 0 <= min <= max <= {MAX_JOINT_ANGLE}."
+                )
+
+    return version, skills
+
+def load_rules(path):
+    """Read, validate and compile a rules file into a RuleSnapshot."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    version, skills = validate_rules(data)
+    return RuleSnapshot(version, skills)
+
+class RuleRegistry:
+    """
+    Serves the current RuleSnapshot and hot-reloads it when the rules file changes.
+
+    Every access checks the file's mtime at most once per `reload_interval` seconds,
+    so each worker process picks up edits on its own without a restart. A new
+    snapshot replaces the old one with a single reference swap; readers that grabbed
+    the old snapshot finish with it consistently. Invalid files, or files whose
+    version did not increase, are logged and ignored.
+    """
+
+    def __init__(self, path, reload_interval):
+        self.path = path
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._file_state = self._stat()
+        self._snapshot = load_rules(path)
+
+    @property
+    def snapshot(self):
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            self._check_for_changes()
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_for_changes(self):
+        # Only one thread does the stat/reload; the others keep using the current snapshot
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = time.monotonic()
+            file_state = self._stat()
+            if file_state is None or file_state == self._file_state:
+                return
+            self._file_state = file_state
+            self.reload()
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """Load the rules file now. Returns True when a new snapshot was published."""
+        try:
+            snapshot = load_rules(self.path)
+        except (OSError, ValueError) as e:
+            logger.error("Ignoring invalid skill rules file", extra={"path": self.path, "error": str(e)})
+            return False
+
+        if snapshot.version <= self._snapshot.version:
+            if snapshot.raw != self._snapshot.raw:
+                logger.error(
+                    "Ignoring changed skill rules without a version bump",
+                    extra={"path": self.path, "version": snapshot.version},
+                )
+            return False
+
+        self._snapshot = snapshot
+        logger.info("Loaded skill rules", extra={"path": self.path, "version": snapshot.version, "skills": len(snapshot.raw)})
+        return True
+
+rule_registry = RuleRegistry(config.SKILL_RULES_PATH, config.SKILL_RULES_RELOAD_INTERVAL_SECONDS)
@@ -0,0 +1,91 @@
+"""
+Production entry point: import and warm everything shareable once, then fork the workers.
+
+`uvicorn api:app --workers N` starts every worker from scratch, so each one
+imports mediapipe, OpenCV and google-genai on its own. Here the parent process
+imports them (and api with its rules, caches and coaching prompts), reads the
+pose model files, and only then forks gunicorn's uvicorn workers, which share
+those pages copy-on-write. Each worker still builds its own pose pool in the
+FastAPI lifespan, since MediaPipe graphs own native threads that cannot be
+forked, and reports 200 on GET /ready once that is done.
+
+Usage (from the backend directory):
+    python serve.py                        # single process
+    python serve.py --workers 4            # pre-forked gunicorn workers (needs gunicorn)
+    python serve.py --report               # print import and warmup timings, then exit
+"""
+import argparse
+import json
+import logging
+import os
+
+from startup import startup_report
+
+logger = logging.getLogger("serve")
+
+def preload():
+    """Import and warm everything that can be shared with forked workers. Returns the ASGI app."""
+    startup_report.preload_modules()
+    api = startup_report.timed_import("api")
+
+    from pose_pool import preload_model_files
+    from rule_registry import rule_registry
+    from coaching_prompts import system_prompt
+
+    with startup_report.warming("model_files"):
+        preload_model_files()
+    with startup_report.warming("parent_rules_and_prompts"):
+        rule_registry.snapshot
+        system_prompt(None)
+
+    logger.info("Preloaded in parent", extra={"pid": os.getpid(), **startup_report.as_dict()})
+    return api.app
+
+def run_gunicorn(app, args):
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        # The app is already imported, so every worker is forked from this warm parent
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("graceful_timeout", args.timeout)
+
+        def load(self):
+            return app
+
+    PreloadedApplication().run()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--timeout", type=int, default=120, help="Worker timeout and graceful shutdown time, in seconds")
+    parser.add_argument("--report", action="store_true", help="Print the startup report as JSON and exit")
+    args = parser.parse_args()
+
+    app = preload()
+
+    if args.report:
+        print(json.dumps(startup_report.as_dict(), indent=2))
+        return
+
+    import uvicorn
+
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port)
+        return
+
+    try:
+        run_gunicorn(app, args)
+    except ImportError:
+        # uvicorn's own multi-worker mode spawns fresh interpreters, so nothing preloaded here is shared
+        logger.warning("gunicorn is not installed; starting uvicorn workers without preloading")
+        uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
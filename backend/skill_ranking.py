@@ -0,0 +1,90 @@
+from calculate_skill_score import PASSING_SCORE
+from landmarks import landmarks_to_array
+from rule_engine import evaluate_catalogue
+from rule_registry import rule_registry
+
+def skill_title(skill):
+    return skill.replace("_", " ").title()
+
+def rank_skills(landmarks, snapshot=None):
+    """
+    Score a pose against every skill in the catalogue in one batched pass.
+
+    Args:
+        landmarks (dict): Body landmark coordinates (or a `Landmarks` object)
+        snapshot (RuleSnapshot): Rules to rank against (default: the live rule registry)
+
+    Returns:
+        list: One dict per skill, best match first: "skill", "family", "level",
+              "score" (the skill's overall score), "match_score" (the same with
+              unmeasured angles counted as 0, used for ordering), "in_range_ratio"
+              and "measured_ratio"
+    """
+    catalogue = (snapshot or rule_registry.snapshot).catalogue
+    result = evaluate_catalogue(catalogue, landmarks_to_array(landmarks))
+
+    ranking = [
+        {
+            "skill": skill,
+            "family": catalogue.families[i],
+            "level": catalogue.levels[i],
+            "score": round(float(result["overall"][0, i]), 1),
+            "match_score": round(float(result["match"][0, i]), 1),
+            "in_range_ratio": round(float(result["in_range"][0, i]), 3),
+            "measured_ratio": round(float(result["measured"][0, i]), 3),
+        }
+        for i, skill in enumerate(catalogue.skills)
+    ]
+    # On a tie the easier progression wins
+    ranking.sort(key=lambda entry: (-entry["match_score"], entry["level"] or 0))
+    return ranking
+
+def suggest_progression(ranking, selected_skill):
+    """
+    Suggest the progression to train next within the skill's family.
+
+    The pose is compared against every level of the family: if another level
+    matches it better, that one is suggested; otherwise a passing attempt moves
+    one level up and a failing one moves one level down.
+
+    Args:
+        ranking (list): Output of `rank_skills`
+        selected_skill (str): The skill the attempt was scored as
+
+    Returns:
+        dict: "family", "current_skill", "current_level", "suggested_skill",
+              "suggested_level", "direction" ("up" or "down") and "reason",
+              or None when the skill has no other levels or nothing needs to change
+    """
+    current = next((entry for entry in ranking if entry["skill"] == selected_skill), None)
+    if current is None or current["family"] is None:
+        return None
+
+    family = sorted((entry for entry in ranking if entry["family"] == current["family"]), key=lambda entry: entry["level"])
+    position = family.index(current)
+    closest = max(family, key=lambda entry: (entry["match_score"], -entry["level"]))
+
+    if closest is not current:
+        suggested = closest
+        reason = (
+            f"Your position matches the {skill_title(closest['skill'])} best "
+            f"({closest['match_score']}/100 vs {current['match_score']}/100 for the {skill_title(selected_skill)})."
+        )
+    elif current["score"] >= PASSING_SCORE and position + 1 < len(family):
+        suggested = family[position + 1]
+        reason = f"You pass the {skill_title(selected_skill)}; the next progression is the {skill_title(suggested['skill'])}."
+    elif current["score"] < PASSING_SCORE and position > 0:
+        suggested = family[position - 1]
+        reason = f"Build a solid {skill_title(suggested['skill'])} first, then come back to the {skill_title(selected_skill)}."
+    else:
+        return None
+
+    return {
+        "family": current["family"],
+        "current_skill": selected_skill,
+        "current_level": current["level"],
+        "suggested_skill": suggested["skill"],
+        "suggested_level": suggested["level"],
+        "direction": "up" if suggested["level"] > current["level"] else "down",
+        "reason": reason,
+    }
@@ -0,0 +1,93 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# The expensive imports behind `import api`. serve.py imports them in the parent
+# before forking so every worker shares those pages instead of loading its own copy.
+HEAVY_MODULES = ("numpy", "cv2", "mediapipe", "google.genai", "fastapi")
+
+# Health checks and scrapes do not count as the "first request"
+PROBE_ROUTES = ("/", "/ready", "/metrics")
+
+class StartupReport:
+    """
+    Where this process spent its startup time, and when it became ready to serve.
+
+    Import and parent-side warmup timings are recorded before a fork and
+    inherited by every worker; each worker then adds its own warmup steps, its
+    readiness and the latency of the first real request it served.
+    """
+
+    def __init__(self):
+        self.import_seconds = {}
+        self.warmup_seconds = {}
+        self.ready = False
+        self.first_request = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def timed_import(self, name):
+        """Import a module and record how long it took (near zero if something already imported it)."""
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.import_seconds[name] = round(time.perf_counter() - start, 4)
+        return module
+
+    def preload_modules(self, names=HEAVY_MODULES):
+        for name in names:
+            self.timed_import(name)
+
+    @contextmanager
+    def warming(self, step):
+        """Time one warmup step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.warmup_seconds[step] = round(time.perf_counter() - start, 4)
+
+    def mark_ready(self):
+        self.ready = True
+        logger.info("Worker ready", extra={"pid": os.getpid(), "warmup_seconds": self.warmup_seconds})
+
+    def mark_stopping(self):
+        self.ready = False
+
+    def observe_request(self, route, seconds):
+        """Record the latency of the first non-probe request this process serves."""
+        if self.first_request is not None or route in PROBE_ROUTES:
+            return
+        with self._lock:
+            if self.first_request is not None:
+                return
+            self.first_request = {
+                "route": route,
+                "seconds": round(seconds, 4),
+                "seconds_since_start": round(time.perf_counter() - self._started, 2),
+            }
+        logger.info("First request served", extra={"pid": os.getpid(), **self.first_request})
+
+    def as_dict(self):
+        return {
+            "pid": os.getpid(),
+            "ready": self.ready,
+            "import_seconds": self.import_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "first_request": self.first_request,
+        }
+
+startup_report = StartupReport()
+
+def _reset_after_fork():
+    # A forked worker has served nothing yet; the inherited import/warmup timings stay
+    startup_report.ready = False
+    startup_report.first_request = None
+    startup_report._started = time.perf_counter()
+    startup_report._lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
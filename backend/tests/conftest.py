@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The API builds its stores at import time; keep them out of the working tree
+os.environ.setdefault("IMAGE_STORE_DIR", tempfile.mkdtemp(prefix="now-image-store-"))
+os.environ.setdefault("HISTORY_DB", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
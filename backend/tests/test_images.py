@@ -0,0 +1,84 @@
+"""HTTP behaviour of the out-of-band image endpoint: ETag revalidation and byte ranges."""
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from image_store import image_store
+
+IMAGE_BYTES = bytes(range(256)) * 4
+
+@pytest.fixture(scope="module")
+def client():
+    # Not entered as a context manager: the lifespan (pose pool warmup) is not needed here
+    return TestClient(api.app)
+
+@pytest.fixture(scope="module")
+def image_id():
+    return image_store.put(IMAGE_BYTES, "image/jpeg")
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=2000-", None),
+    ("bytes=10-5", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    assert api.parse_range(header, len(IMAGE_BYTES)) == expected
+
+def test_image_full_and_conditional(client, image_id):
+    response = client.get(f"/images/{image_id}")
+    assert response.status_code == 200
+    assert response.content == IMAGE_BYTES
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = client.get(f"/images/{image_id}", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('"abcd"', False),
+    ("", False),
+])
+def test_etag_matches(header, expected):
+    assert api.etag_matches(header, '"abc"') is expected
+
+def test_image_conditional_lists(client, image_id):
+    etag = f'"{image_id}"'
+    for header in (f'"other", {etag}', f"W/{etag}", "*"):
+        assert client.get(f"/images/{image_id}", headers={"If-None-Match": header}).status_code == 304
+    assert client.get(f"/images/{image_id}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_read_file_range(tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(IMAGE_BYTES)
+    assert api.read_file_range(str(path), 1000, 24) == IMAGE_BYTES[1000:]
+    assert api.read_file_range(str(path), 1020, 100) == IMAGE_BYTES[1020:]
+
+def test_image_range(client, image_id):
+    response = client.get(f"/images/{image_id}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == IMAGE_BYTES[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(IMAGE_BYTES)}"
+
+    response = client.get(f"/images/{image_id}", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.content == IMAGE_BYTES[-24:]
+    assert response.headers["content-range"] == f"bytes 1000-1023/{len(IMAGE_BYTES)}"
+
+    response = client.get(f"/images/{image_id}", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(IMAGE_BYTES)}"
+
+def test_unknown_image(client):
+    assert client.get("/images/" + "0" * 64 + ".jpg").status_code == 404
+    assert client.get("/images/not-an-id").status_code == 404
@@ -0,0 +1,93 @@
+"""Parity of the vectorized rule engine with the per-angle scalar scoring it replaced."""
+import math
+
+import numpy as np
+import pytest
+
+from calculate_angle import calculate_angle
+from calculate_skill_score import calculate_angle_score, evaluate_skill
+from landmarks import DERIVED_LANDMARKS, LANDMARK_NAMES, landmarks_to_array
+from rule_engine import evaluate, evaluate_catalogue
+from rule_registry import rule_registry
+
+RULES = rule_registry.snapshot
+SKILLS = sorted(RULES.raw)
+
+def fixed_landmark_sets(count=20, seed=1234):
+    """Seeded random poses in pixel coordinates, with the derived midpoints filled in."""
+    rng = np.random.default_rng(seed)
+    landmark_sets = []
+    for coordinates in rng.uniform(0, 1000, (count, len(LANDMARK_NAMES), 2)):
+        landmarks = {name: (float(x), float(y)) for name, (x, y) in zip(LANDMARK_NAMES, coordinates)}
+        for name, (first, second) in DERIVED_LANDMARKS.items():
+            landmarks[name] = tuple((a + b) / 2 for a, b in zip(landmarks[first], landmarks[second]))
+        landmark_sets.append(landmarks)
+
+    # One pose with landmarks the model did not detect
+    partial = dict(landmark_sets[0])
+    for name in ("LEFT_WRIST", "RIGHT_ANKLE", "LEFT_HIP"):
+        del partial[name]
+    del partial["MID_HIP"]
+    landmark_sets.append(partial)
+    return landmark_sets
+
+LANDMARK_SETS = fixed_landmark_sets()
+
+def scalar_score(skill, landmarks):
+    """One calculate_angle/calculate_angle_score call per rule: the scoring path before vectorization."""
+    results = []
+    for rule in RULES.raw[skill]["angles_to_check"]:
+        points = [landmarks.get(name) for name in rule["points"]]
+        if not all(points):
+            results.append((None, 0.0))
+            continue
+        angle = calculate_angle(*points)
+        if math.isnan(angle):
+            results.append((None, 0.0))
+            continue
+        results.append((angle, calculate_angle_score(angle, rule["min"], rule["max"])))
+
+    measured = [score for angle, score in results if angle is not None]
+    return results, sum(measured) / len(measured) if measured else 0.0
+
+@pytest.mark.parametrize("skill", SKILLS)
+def test_evaluate_skill_matches_scalar_path(skill):
+    for landmarks in LANDMARK_SETS:
+        expected, expected_overall = scalar_score(skill, landmarks)
+        angle_results, overall = evaluate_skill(skill, landmarks)
+
+        assert len(angle_results) == len(expected)
+        for angle_result, (angle, score) in zip(angle_results, expected):
+            if angle is None:
+                assert angle_result.angle is None
+                assert angle_result.score == 0.0
+            else:
+                assert angle_result.angle == pytest.approx(angle, abs=1e-6)
+                assert angle_result.score == pytest.approx(score, abs=1e-6)
+        assert overall == pytest.approx(expected_overall, abs=1e-6)
+
+def test_batched_frames_match_single_frames():
+    frames = np.stack([landmarks_to_array(landmarks) for landmarks in LANDMARK_SETS])
+    for skill in SKILLS:
+        batched = evaluate(RULES.compiled[skill], frames)["overall"]
+        expected = [scalar_score(skill, landmarks)[1] for landmarks in LANDMARK_SETS]
+        np.testing.assert_allclose(batched, expected, atol=1e-6)
+
+def test_catalogue_matches_scalar_path():
+    catalogue = RULES.catalogue
+    for landmarks in LANDMARK_SETS:
+        overall = evaluate_catalogue(catalogue, landmarks_to_array(landmarks))["overall"][0]
+        expected = [scalar_score(skill, landmarks)[1] for skill in catalogue.skills]
+        np.testing.assert_allclose(overall, expected, atol=1e-6)
+
+def test_coinciding_landmarks_are_unmeasurable():
+    landmarks = dict(LANDMARK_SETS[1])
+    landmarks["LEFT_ELBOW"] = landmarks["LEFT_SHOULDER"]
+    assert math.isnan(calculate_angle(landmarks["LEFT_SHOULDER"], landmarks["LEFT_ELBOW"], landmarks["LEFT_WRIST"]))
+
+    angle_results, overall = evaluate_skill("elbow_lever", landmarks)
+    elbow = next(result for result in angle_results if result.name == "Elbow Angle")
+    assert elbow.status == "error"
+    assert elbow.angle is None
+    measured = [result.score for result in angle_results if result.status in ("in_range", "out_of_range")]
+    assert overall == pytest.approx(sum(measured) / len(measured))
@@ -0,0 +1,23 @@
+"""Skill auto-detection when no skill_id is given."""
+import config
+from analyze import prepare_analysis
+from test_rule_engine import LANDMARK_SETS
+
+def test_weak_best_match_is_not_detected(monkeypatch):
+    monkeypatch.setattr(config, "SKILL_DETECT_MIN_MATCH_SCORE", 101.0)
+    prepared = prepare_analysis(None, LANDMARK_SETS[0])
+
+    assert prepared["skill"] is None
+    assert prepared["skill_detected"] is False
+    assert prepared["summary"] is None
+    assert "Could not recognize a skill" in prepared["feedback"]
+    # The ranking is still returned so the client can offer the closest skills
+    assert prepared["ranking"]
+
+def test_confident_best_match_is_detected(monkeypatch):
+    monkeypatch.setattr(config, "SKILL_DETECT_MIN_MATCH_SCORE", 0.0)
+    prepared = prepare_analysis(None, LANDMARK_SETS[0])
+
+    assert prepared["skill_detected"] is True
+    assert prepared["skill"] == prepared["ranking"][0]["skill"]
+    assert prepared["summary"].startswith("SKILL NAME: " + prepared["skill"])
@@ -0,0 +1,46 @@
+"""413 handling of UploadLimitMiddleware, for declared and streamed bodies."""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import api
+from upload_limits import UploadLimitMiddleware
+
+async def echo_length(request):
+    return JSONResponse({"received": len(await request.body())})
+
+@pytest.fixture
+def limited_client():
+    app = Starlette(routes=[Route("/upload", echo_length, methods=["POST"]), Route("/big", echo_length, methods=["POST"])])
+    app.add_middleware(UploadLimitMiddleware, default_limit=100, path_limits={"/big": 1000})
+    return TestClient(app, raise_server_exceptions=False)
+
+def test_upload_under_limit(limited_client):
+    response = limited_client.post("/upload", content=b"x" * 100)
+    assert response.status_code == 200
+    assert response.json() == {"received": 100}
+
+def test_declared_length_over_limit(limited_client):
+    response = limited_client.post("/upload", content=b"x" * 101)
+    assert response.status_code == 413
+    assert "100 bytes" in response.json()["message"]
+
+def test_streamed_body_over_limit(limited_client):
+    # A generator body is sent chunked, without a Content-Length
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 30
+
+    response = limited_client.post("/upload", content=chunks())
+    assert response.status_code == 413
+
+def test_path_limit(limited_client):
+    assert limited_client.post("/big", content=b"x" * 500).status_code == 200
+    assert limited_client.post("/big", content=b"x" * 1001).status_code == 413
+
+def test_api_rejects_oversized_analyze():
+    client = TestClient(api.app)
+    response = client.post("/analyze", headers={"Content-Length": str(api.config.MAX_UPLOAD_BYTES + 1)}, content=b"")
+    assert response.status_code == 413
@@ -0,0 +1,121 @@
+"""Hold detection, frame sampling and the text summary of video analysis."""
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+import video_analyzer
+from landmarks import NUM_LANDMARKS
+from rule_registry import rule_registry
+from video_analyzer import analyze_video, find_longest_hold, summarize_video
+
+FPS = 10.0
+FRAME_INTERVAL = 0.2
+
+def timeline_from(pattern):
+    """One sampled frame per character, every FRAME_INTERVAL seconds: "x" in range, "." not."""
+    return [{"time": i * FRAME_INTERVAL, "in_range": flag == "x", "detected": True} for i, flag in enumerate(pattern)]
+
+def test_gap_splits_a_hold():
+    hold = find_longest_hold(timeline_from("xx.xxxx.x"), FRAME_INTERVAL)
+    assert hold == {"seconds": 0.8, "start_time": 0.6, "end_time": 1.2}
+
+def test_hold_ending_at_last_frame():
+    hold = find_longest_hold(timeline_from("x...xxx"), FRAME_INTERVAL)
+    assert hold == {"seconds": 0.6, "start_time": 0.8, "end_time": 1.2}
+
+def test_whole_clip_in_range():
+    hold = find_longest_hold(timeline_from("xxxxx"), FRAME_INTERVAL)
+    assert hold == {"seconds": 1.0, "start_time": 0.0, "end_time": 0.8}
+
+def test_first_of_equal_holds_wins():
+    hold = find_longest_hold(timeline_from("xx.xx"), FRAME_INTERVAL)
+    assert hold["start_time"] == 0.0
+
+def test_single_frame_counts_one_interval():
+    hold = find_longest_hold(timeline_from("..x.."), FRAME_INTERVAL)
+    assert hold == {"seconds": 0.2, "start_time": 0.4, "end_time": 0.4}
+
+@pytest.mark.parametrize("pattern", ["", ".....", "."])
+def test_no_hold(pattern):
+    assert find_longest_hold(timeline_from(pattern), FRAME_INTERVAL) == {"seconds": 0.0, "start_time": None, "end_time": None}
+
+def test_summary_aggregates_detected_frames():
+    rules = {"angles_to_check": [
+        {"name": "Elbow Angle", "points": [], "min": 170, "max": 180},
+        {"name": "Hip Angle", "points": [], "min": 90, "max": 100},
+    ]}
+    timeline = [
+        {"detected": True, "overall_score": 80.0, "angles": {"Elbow Angle": 175.0, "Hip Angle": None}},
+        {"detected": True, "overall_score": 60.0, "angles": {"Elbow Angle": 165.0, "Hip Angle": None}},
+        {"detected": False, "overall_score": 0.0, "angles": {}},
+    ]
+    summary = summarize_video("l_sit", rules, timeline, {"seconds": 0.5}, 3)
+
+    assert "(2 of 3 sampled frames with a detected pose)" in summary
+    assert "Elbow Angle: average 170.0° (min 165.0°, max 175.0°), in the ideal range of 170-180° for 50% of frames." in summary
+    assert "Hip Angle: Could not be measured in any frame." in summary
+    assert "LONGEST HOLD WITH ALL ANGLES IN RANGE: 0.5 seconds" in summary
+    assert "AVERAGE SCORE: 70.0/100" in summary
+
+class FakePose:
+    """Stands in for MediaPipe's tracking Pose: a fixed pose, except on frames listed in `missing`."""
+
+    def __init__(self, missing, **kwargs):
+        self.missing = missing
+        self.calls = 0
+        rng = np.random.default_rng(7)
+        self.landmarks = SimpleNamespace(landmark=[
+            SimpleNamespace(x=x, y=y, z=0.0, visibility=1.0) for x, y in rng.uniform(0.1, 0.9, (NUM_LANDMARKS, 2))
+        ])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def process(self, frame):
+        call = self.calls
+        self.calls += 1
+        return SimpleNamespace(pose_landmarks=None if call in self.missing else self.landmarks)
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    for _ in range(10):
+        writer.write(np.zeros((48, 64, 3), np.uint8))
+    writer.release()
+    return path
+
+def use_fake_pose(monkeypatch, missing=()):
+    pose = SimpleNamespace(Pose=lambda **kwargs: FakePose(missing, **kwargs))
+    monkeypatch.setattr(video_analyzer, "mp", SimpleNamespace(solutions=SimpleNamespace(pose=pose)))
+
+def test_stride_and_timeline(monkeypatch, video_path):
+    # The second sampled frame (frame 3) has no pose
+    use_fake_pose(monkeypatch, missing={1})
+    skill = sorted(rule_registry.snapshot.raw)[0]
+    result = analyze_video(video_path, skill, frame_stride=3)
+
+    assert result["frame_stride"] == 3
+    assert [frame["frame"] for frame in result["timeline"]] == [0, 3, 6, 9]
+    assert [frame["time"] for frame in result["timeline"]] == [0.0, 0.3, 0.6, 0.9]
+    assert [frame["detected"] for frame in result["timeline"]] == [True, False, True, True]
+    assert result["frames_sampled"] == 4
+    assert result["frames_with_pose"] == 3
+    assert result["timeline"][1]["overall_score"] == 0.0
+    # The same pose on every detected frame gives the same score, so the average is that score
+    assert result["average_score"] == result["timeline"][0]["overall_score"]
+    assert result["summary"].startswith(f"SKILL NAME: {skill}")
+
+def test_video_without_pose(monkeypatch, video_path):
+    use_fake_pose(monkeypatch, missing=set(range(10)))
+    with pytest.raises(ValueError, match="No human pose"):
+        analyze_video(video_path, sorted(rule_registry.snapshot.raw)[0], frame_stride=2)
+
+def test_unknown_skill(video_path):
+    with pytest.raises(ValueError, match="not implemented"):
+        analyze_video(video_path, "no_such_skill")
@@ -0,0 +1,82 @@
+import json
+
+class UploadTooLargeError(Exception):
+    pass
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps request body sizes before the app buffers them.
+
+    Requests that declare a Content-Length over the limit are answered with 413
+    without reading a byte of the body. Bodies without a (truthful) length are
+    counted as they stream in; as soon as the limit is crossed, reading stops
+    and whatever response the app produces is replaced with the 413, so a
+    chunked upload can never grow past the cap in memory or in the spool file.
+
+    Args:
+        app: The ASGI app to wrap
+        default_limit (int): Max body bytes for any path not in `path_limits` (0 disables)
+        path_limits (dict): Path -> max body bytes for endpoints with their own limit
+    """
+
+    def __init__(self, app, default_limit, path_limits=None):
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.default_limit)
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self.reject(send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLargeError(f"Upload exceeds the {limit} byte limit.")
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The app turned the aborted read into its own error response; send the 413 instead
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self.reject(send, limit)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLargeError:
+            if not response_started:
+                await self.reject(send, limit)
+
+    @staticmethod
+    async def reject(send, limit):
+        body = json.dumps({"message": f"Upload too large. The limit for this endpoint is {limit} bytes."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))],
+        })
+        await send({"type": "http.response.body", "body": body})
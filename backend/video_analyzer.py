@@ -0,0 +1,197 @@
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import config
+from landmarks import Landmarks, NUM_POINTS
+from metrics import timed
+from rule_engine import evaluate
+from rule_registry import rule_registry
+
+def find_longest_hold(timeline, frame_interval):
+    """
+    Find the longest run of consecutive sampled frames where every angle was in range.
+
+    Args:
+        timeline (list): Per-frame entries produced by `analyze_video`
+        frame_interval (float): Seconds between two sampled frames
+
+    Returns:
+        dict: Hold duration in seconds plus its start/end timestamps (None when there was no hold)
+    """
+    best_start = best_end = None
+    run_start = None
+
+    for i, frame in enumerate(timeline):
+        if frame["in_range"]:
+            if run_start is None:
+                run_start = i
+            if best_start is None or (i - run_start) > (best_end - best_start):
+                best_start, best_end = run_start, i
+        else:
+            run_start = None
+
+    if best_start is None:
+        return {"seconds": 0.0, "start_time": None, "end_time": None}
+
+    start_time = timeline[best_start]["time"]
+    end_time = timeline[best_end]["time"]
+    return {
+        # A single in-range frame still represents one sampling interval of holding
+        "seconds": round(end_time - start_time + frame_interval, 2),
+        "start_time": round(start_time, 2),
+        "end_time": round(end_time, 2),
+    }
+
+def summarize_video(selected_skill, rules, timeline, longest_hold, frames_sampled):
+    """Aggregate the per-frame results into one short text for a single LLM call."""
+    detected = [frame for frame in timeline if frame["detected"]]
+
+    lines = []
+    for angle_rule in rules["angles_to_check"]:
+        angle_name = angle_rule["name"]
+        min_angle, max_angle = angle_rule["min"], angle_rule["max"]
+        values = [frame["angles"][angle_name] for frame in detected if frame["angles"].get(angle_name) is not None]
+
+        if not values:
+            lines.append(f"{angle_name}: Could not be measured in any frame.")
+            continue
+
+        in_range = sum(1 for value in values if min_angle <= value <= max_angle)
+        lines.append(
+            f"{angle_name}: average {sum(values) / len(values):.1f}° (min {min(values):.1f}°, max {max(values):.1f}°), "
+            f"in the ideal range of {min_angle}-{max_angle}° for {100 * in_range / len(values):.0f}% of frames."
+        )
+
+    average_score = sum(frame["overall_score"] for frame in detected) / len(detected) if detected else 0.0
+
+    return (
+        "SKILL NAME: " + selected_skill + "\n\n"
+        + f"VIDEO ANALYSIS RESULTS ({len(detected)} of {frames_sampled} sampled frames with a detected pose):\n\n"
+        + "\n\n".join(lines)
+        + f"\n\nLONGEST HOLD WITH ALL ANGLES IN RANGE: {longest_hold['seconds']:.1f} seconds"
+        + f"\n\nAVERAGE SCORE: {average_score:.1f}/100"
+    )
+
+def probe_frame_size(video_path):
+    """(width, height) of a video's frames from its container metadata, or None if it cannot be opened."""
+    capture = cv2.VideoCapture(video_path)
+    try:
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        capture.release()
+    return (width, height) if width > 0 and height > 0 else None
+
+def analyze_video(video_path, selected_skill, frame_stride=None):
+    """
+    Track the pose through a video and score every sampled frame against the skill rules.
+
+    Frames are decoded one at a time, so memory stays flat regardless of video length.
+    Pose runs in tracking mode (static_image_mode=False): after the first detection
+    it follows the person from frame to frame, which is much cheaper than detecting
+    from scratch every time.
+
+    Args:
+        video_path (str): Path to the uploaded video on disk
+        selected_skill (str): Skill name in the rule registry
+        frame_stride (int): Analyze every n-th frame (default: VIDEO_FRAME_STRIDE)
+
+    Returns:
+        dict: Per-frame timeline, longest hold, average score and the text summary for the LLM
+    """
+    snapshot = rule_registry.snapshot
+    if selected_skill not in snapshot.raw:
+        raise ValueError(f"Analysis for the skill '{selected_skill}' is not implemented yet.")
+
+    frame_stride = max(1, frame_stride or config.VIDEO_FRAME_STRIDE)
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError("Could not decode video.")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_indices = []
+    frame_points = []
+    frame_index = -1
+
+    try:
+        with mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=config.POSE_MODEL_COMPLEXITY,
+            min_detection_confidence=config.POSE_MIN_DETECTION_CONFIDENCE,
+            min_tracking_confidence=config.VIDEO_MIN_TRACKING_CONFIDENCE,
+        ) as pose:
+            while len(frame_indices) < config.VIDEO_MAX_SAMPLED_FRAMES:
+                frame_index += 1
+
+                # grab() skips the frame without paying for the full decode
+                if frame_index % frame_stride:
+                    if not capture.grab():
+                        break
+                    continue
+
+                ok, frame = capture.read()
+                if not ok:
+                    break
+
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                with timed("video_inference"):
+                    results = pose.process(frame_rgb)
+                frame_indices.append(frame_index)
+
+                if results.pose_landmarks:
+                    frame_height, frame_width, _ = frame.shape
+                    frame_points.append(Landmarks.from_mediapipe(results.pose_landmarks, frame_width, frame_height).points())
+                else:
+                    frame_points.append(np.full((NUM_POINTS, 2), np.nan))
+    finally:
+        capture.release()
+
+    if not frame_indices:
+        raise ValueError("Could not decode any frames from the video.")
+
+    # Score every sampled frame in one batched pass over the (N, NUM_POINTS, 2) tensor
+    compiled = snapshot.compiled[selected_skill]
+    points = np.stack(frame_points)
+    detected_mask = ~np.isnan(points).all(axis=(1, 2))
+    with timed("video_scoring"):
+        result = evaluate(compiled, points)
+    angles = np.round(result["angles"], 1)
+    scores = np.round(result["scores"], 1)
+    all_in_range = result["in_range"].all(axis=-1)
+
+    timeline = []
+    for row, frame_number in enumerate(frame_indices):
+        entry = {"frame": frame_number, "time": round(frame_number / fps, 3), "detected": bool(detected_mask[row])}
+        if detected_mask[row]:
+            entry.update({
+                "overall_score": round(float(result["overall"][row]), 1),
+                "angles": {
+                    name: (None if np.isnan(angles[row, i]) else float(angles[row, i]))
+                    for i, name in enumerate(compiled.angle_names)
+                },
+                "scores": {name: float(scores[row, i]) for i, name in enumerate(compiled.angle_names)},
+                "in_range": bool(all_in_range[row]),
+            })
+        else:
+            entry.update({"overall_score": 0.0, "angles": {}, "scores": {}, "in_range": False})
+        timeline.append(entry)
+
+    longest_hold = find_longest_hold(timeline, frame_stride / fps)
+    detected = [frame for frame in timeline if frame["detected"]]
+    if not detected:
+        raise ValueError("No human pose detected in the video.")
+
+    return {
+        "skill": selected_skill,
+        "rules_version": snapshot.version,
+        "fps": fps,
+        "frame_stride": frame_stride,
+        "frames_sampled": len(timeline),
+        "frames_with_pose": len(detected),
+        "average_score": round(sum(frame["overall_score"] for frame in detected) / len(detected), 1),
+        "longest_hold": longest_hold,
+        "timeline": timeline,
+        "summary": summarize_video(selected_skill, snapshot.raw[selected_skill], timeline, longest_hold, len(timeline)),
+    }
@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import config
+
+
+class OverloadedError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Server is at capacity, please retry later.")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds how many requests run the analysis pipeline at once.
+
+    Up to `max_concurrent` requests are admitted immediately, up to `max_queue`
+    more wait their turn, and the rest are turned away with OverloadedError so
+    the server sheds load instead of piling up work it cannot finish.
+
+    With a `memory_budget`, each request also reserves its estimated memory and
+    waits until it fits next to the requests already running, so a burst of
+    large uploads is serialized instead of multiplying peak memory. A request
+    larger than the whole budget still runs, but only on its own.
+    """
+
+    def __init__(self, max_concurrent, max_queue, retry_after, memory_budget=0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.memory_budget = memory_budget
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # FIFO of (bytes, future) for requests waiting for their memory estimate to fit
+        self._memory_waiters = deque()
+        self.memory_in_use = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @asynccontextmanager
+    async def admit(self, memory=0):
+        await self.acquire(memory)
+        try:
+            yield
+        finally:
+            self.release(memory)
+
+    async def acquire(self, memory=0):
+        """
+        Take a slot, waiting in the queue if needed. Prefer `admit()` unless the slot must outlive a `with` block.
+
+        Args:
+            memory (int): Estimated peak bytes of the request, reserved against the memory budget
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected_total += 1
+            raise OverloadedError(self.retry_after)
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self._reserve_memory(memory)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - start
+        self.admitted_total += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        self.in_flight += 1
+
+    def release(self, memory=0):
+        self.in_flight -= 1
+        self.memory_in_use -= memory
+        self._semaphore.release()
+        self._wake_memory_waiters()
+
+    def _memory_fits(self, memory):
+        return not self.memory_budget or self.memory_in_use == 0 or self.memory_in_use + memory <= self.memory_budget
+
+    async def _reserve_memory(self, memory):
+        if not self._memory_waiters and self._memory_fits(memory):
+            self.memory_in_use += memory
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._memory_waiters.append((memory, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Reserved just as the waiter was cancelled: hand the memory back
+                self.memory_in_use -= memory
+                self._wake_memory_waiters()
+            raise
+
+    def _wake_memory_waiters(self):
+        # Strict FIFO, so a large upload is not starved by a stream of small ones
+        while self._memory_waiters:
+            memory, future = self._memory_waiters[0]
+            if future.done():
+                self._memory_waiters.popleft()
+                continue
+            if not self._memory_fits(memory):
+                break
+            self._memory_waiters.popleft()
+            self.memory_in_use += memory
+            future.set_result(None)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.admitted_total, 4) if self.admitted_total else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "memory_in_use_bytes": self.memory_in_use,
+            "memory_budget_bytes": self.memory_budget,
+        }
+
+def estimate_request_memory(upload_bytes=0, decode_bytes=None):
+    """
+    Rough peak memory of one photo analysis: the upload itself plus decode buffers.
+
+    Args:
+        upload_bytes (int): Size of the upload held in memory
+        decode_bytes (int): Decode estimate from `pose_detector.estimate_decode_bytes`. When the
+                            size is unknown, reduced-resolution decoding is assumed: it stops at
+                            the largest factor that keeps at least POSE_INPUT_MAX_SIDE pixels, so
+                            the decoded frame has up to ~4x the working image's pixels
+    """
+    if decode_bytes is None:
+        side = config.POSE_INPUT_MAX_SIDE
+        decode_bytes = 5 * side * side * 3
+    return upload_bytes + decode_bytes
+
+# Assumed when a video's frame size cannot be read
+DEFAULT_VIDEO_FRAME_SIZE = (1920, 1080)
+
+def estimate_video_memory(frame_size=None):
+    """
+    Rough peak memory of one video analysis, which decodes every frame at full resolution.
+
+    Counts the BGR frame, its RGB copy for MediaPipe, and about four YUV 4:2:0
+    reference frames held by the decoder. The upload itself stays on disk.
+
+    Args:
+        frame_size (tuple): (width, height) of the video's frames
+    """
+    width, height = frame_size or DEFAULT_VIDEO_FRAME_SIZE
+    pixels = width * height
+    return 2 * pixels * 3 + 4 * pixels * 3 // 2
+
+
+admission = AdmissionController(
+    config.MAX_CONCURRENT_REQUESTS,
+    config.MAX_QUEUED_REQUESTS,
+    config.RETRY_AFTER_SECONDS,
+    config.MEMORY_BUDGET_BYTES,
+)
+
+_cpu_executor = None
+_llm_executor = None
+_batch_executor = None
+_executor_lock = threading.Lock()
+
+
+def _process_context():
+    # Workers start from a clean forkserver process rather than a fork of this one,
+    # whose pose graphs, logging and LLM client threads would not survive the fork
+    return multiprocessing.get_context("forkserver")
+
+
+def _init_cpu_worker():
+    # Each worker process owns its own detectors; warm them before the first job.
+    from pose_pool import get_pose_pool
+    get_pose_pool()
+
+
+def warm_cpu_executor():
+    """In process mode, start the CPU workers (each warms its own pose pool) now instead of on the first request."""
+    if config.CPU_EXECUTOR != "process":
+        return
+    executor = get_cpu_executor()
+    for future in [executor.submit(os.getpid) for _ in range(config.CPU_WORKERS)]:
+        future.result()
+
+
+def get_cpu_executor():
+    """Executor for decode, inference, drawing, encoding and scoring."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _executor_lock:
+            if _cpu_executor is None:
+                if config.CPU_EXECUTOR == "process":
+                    _cpu_executor = ProcessPoolExecutor(max_workers=config.CPU_WORKERS, mp_context=_process_context(), initializer=_init_cpu_worker)
+                else:
+                    _cpu_executor = ThreadPoolExecutor(max_workers=config.CPU_WORKERS, thread_name_prefix="cpu")
+    return _cpu_executor
+
+
+def get_llm_executor():
+    """Executor for blocking LLM calls, kept apart so slow coaching never starves the CV stages."""
+    global _llm_executor
+    if _llm_executor is None:
+        with _executor_lock:
+            if _llm_executor is None:
+                _llm_executor = ThreadPoolExecutor(max_workers=config.LLM_WORKERS, thread_name_prefix="llm")
+    return _llm_executor
+
+
+def get_batch_executor():
+    """Process pool for batch uploads, one worker per core, so a whole session of photos runs in parallel."""
+    global _batch_executor
+    if _batch_executor is None:
+        with _executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ProcessPoolExecutor(max_workers=config.BATCH_WORKERS, mp_context=_process_context(), initializer=_init_cpu_worker)
+    return _batch_executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_batch(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_batch_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_llm(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_llm_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executors():
+    global _cpu_executor, _llm_executor, _batch_executor
+    with _executor_lock:
+        for executor in (_cpu_executor, _llm_executor, _batch_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+        _llm_executor = None
+        _batch_executor = None
+
+
+def worker_stats():
+    return {
+        "admission": admission.stats(),
+        "cpu_executor": config.CPU_EXECUTOR,
+        "cpu_workers": config.CPU_WORKERS,
+        "llm_workers": config.LLM_WORKERS,
+        "batch_workers": config.BATCH_WORKERS,
+    }